@@ -1,16 +1,52 @@
 # main.py
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional, Dict, Any
-import spacy
+from typing import List, Optional, Dict, Any, Callable, Iterable, Iterator
 import datetime
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, func, or_
+from sqlalchemy import create_engine, inspect, text, Column, Integer, String, DateTime, Text, Index, func, or_, and_, select, insert, delete
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-import os
-import re
-from intents import INTENT_PATTERNS  
+from fastapi.concurrency import run_in_threadpool
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import json
+import threading
+import time
+import uuid
+from config import (
+    DATABASE_URL, ASYNC_DB, ASYNC_DATABASE_URL, NLP_THREADS,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_POOL_WARM,
+    NLP_WORKERS, NLP_WORKER_BATCH_SIZE, NLP_MAX_PENDING, NLP_WORKER_START_METHOD,
+    NLP_MICRO_BATCHING, NLP_BATCH_MAX_SIZE, NLP_BATCH_MAX_WAIT_MS,
+    RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, STATS_SNAPSHOT_INTERVAL,
+    SEARCH_INDEX_ENABLED, CHANGE_FEED_INTERVAL, CHANGE_FEED_FULL_RESYNC,
+    MESSAGE_WRITE_BEHIND, MESSAGE_FLUSH_INTERVAL_MS, MESSAGE_FLUSH_BATCH, MESSAGE_QUEUE_SIZE,
+    SUGGESTION_FLUSH_INTERVAL, MESSAGE_RETENTION_DAYS, ARCHIVE_INTERVAL_HOURS, ARCHIVE_BATCH_SIZE,
+    NLP_EAGER_LOAD, LIST_RESULT_LIMIT, LIST_YIELD_PER, CHATBOT_BATCH_MAX,
+    DB_QUERY_METRICS, PROFILER_ENABLED, PROFILER_INTERVAL_MS, PROFILER_MAX_STACKS,
+    CATALOG_SNAPSHOT_ENABLED, LIST_FRAGMENT_CACHE_SIZE
+)
+from nlp_pipeline import (
+    get_nlp, nlp_ready, warm_up, warm_up_in_background, NLP_PROFILE, RULE_ONLY_INTENTS, tier_stats,
+    MessageAnalysis, analyze_message, analyze_with_rules, analyze_batch, extract_entities, classify_intent
+)
+from nlp_pool import NLPWorkerPool, NLPPoolBusy
+from nlp_batcher import MicroBatcher
+from response_cache import ResponseCache
+from fragment_store import FragmentStore
+from intent_router import IntentRouter, IntentHandler
+from metrics import Metrics, QueryTally, SamplingProfiler, instrument_engine, track_queries
+from stats_provider import StatsProvider
+from search_index import NameIndex, index_subscriber, is_close_match, rank_by_similarity
+from change_feed import ChangeFeed, TableChanges
+from catalog_snapshot import CatalogSnapshots, SnapshotSpec
+from message_writer import WriteBehindBuffer
+from suggestion_ranker import SuggestionRanker
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -26,11 +62,89 @@ app.add_middleware(
 )
 
 # Database setup for SQL Server
-SQLALCHEMY_DATABASE_URL = os.getenv('DATABASE_URL', "mssql+pyodbc://sa:kiran@HP\\SQLEXPRESS/ECommerceDB?driver=ODBC+Driver+17+for+SQL+Server")
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"driver": "ODBC Driver 17 for SQL Server"})
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+# The ODBC driver argument only applies to SQL Server; local SQLite stand-ins take none
+connect_args = {"driver": "ODBC Driver 17 for SQL Server"} if SQLALCHEMY_DATABASE_URL.startswith("mssql") else {}
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Pool settings from config, for the dialects that pool connections in a QueuePool.
+
+    The pool class depends on the driver and the SQLAlchemy version (in-memory SQLite shares one
+    connection, and aiosqlite files get a NullPool on some releases); those reject the sizing
+    arguments and take none.
+    """
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    parsed = make_url(url)
+    if issubclass(parsed.get_dialect().get_pool_class(parsed), QueuePool):
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE
+        )
+    return options
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args, **engine_options(SQLALCHEMY_DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+def async_database_url(url: str) -> str:
+    """Swap a sync driver for its asyncio counterpart"""
+    if url.startswith("mssql+pyodbc"):
+        return url.replace("mssql+pyodbc", "mssql+aioodbc", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+# Optional async engine for the light reads in run_db; chat turns stay on the thread pool
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    async_url = ASYNC_DATABASE_URL or async_database_url(SQLALCHEMY_DATABASE_URL)
+    async_engine = create_async_engine(async_url, connect_args=connect_args, **engine_options(async_url))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autocommit=False, autoflush=False)
+
+# Stage timers, counters and per-query latency, exported on /metrics
+metrics = Metrics()
+if DB_QUERY_METRICS:
+    instrument_engine(engine, metrics)
+    if async_engine is not None:
+        instrument_engine(async_engine.sync_engine, metrics)
+
+# Sampling profiler, off unless PROFILER_ENABLED or switched on through POST /profiler
+profiler = SamplingProfiler(interval_ms=PROFILER_INTERVAL_MS, max_stacks=PROFILER_MAX_STACKS)
+
+def warm_pool(count: int = DB_POOL_WARM) -> int:
+    """Open up to count pooled connections at once and return them to the pool"""
+    count = min(count, DB_POOL_SIZE)
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+async def warm_async_pool(count: int = DB_POOL_WARM) -> int:
+    count = min(count, DB_POOL_SIZE)
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(await async_engine.connect())
+    finally:
+        for connection in connections:
+            await connection.close()
+    return len(connections)
+
+def pool_stats(pool) -> Dict[str, Any]:
+    stats = {"pool": type(pool).__name__, "status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    return stats
+
 # Database models
 class MessageDB(Base):
     __tablename__ = "messages"
@@ -38,6 +152,25 @@ class MessageDB(Base):
     content = Column(Text, nullable=False)
     is_user = Column(Integer, nullable=False)  # 1 for user, 0 for bot
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
+    conversation_id = Column(String(64))  # None for messages stored before conversations existed
+
+    # Support keyset pagination of /history newest first, globally and per conversation
+    __table_args__ = (
+        Index("ix_messages_timestamp_id", "timestamp", "id"),
+        Index("ix_messages_conversation_timestamp_id", "conversation_id", "timestamp", "id"),
+    )
+
+# Cold storage for conversations past the retention window
+class ArchivedMessageDB(Base):
+    __tablename__ = "messages_archive"
+    id = Column(Integer, primary_key=True)
+    # The original messages.id; not unique, since SQLite reuses the ids of deleted rows
+    message_id = Column(Integer, index=True)
+    content = Column(Text, nullable=False)
+    is_user = Column(Integer, nullable=False)
+    timestamp = Column(DateTime)
+    conversation_id = Column(String(64), index=True)
+    archived_at = Column(DateTime, default=datetime.datetime.utcnow)
 
 class SuggestionDB(Base):
     __tablename__ = "suggestions"
@@ -106,33 +239,79 @@ class Supplier(Base):
     CreatedAt = Column(DateTime, default=datetime.datetime.utcnow)
     UpdatedAt = Column(DateTime)
 
-# Create tables if they don't exist
-Base.metadata.create_all(bind=engine)
-
-# Initialize suggestions
-def initialize_suggestions():
-    db = SessionLocal()
-    default_suggestions = [
-        "List all products",
-        "Show product categories",
-        "Show brands",
-        "List all users",
-        "How many products in stock?",
-        "How many suppliers?",
-        "Show out of stock products",
-        "Show user permissions",
-        "Give email id of supplier Avantika Patil",
-        "What's the price of Laptop XPS 15?",
-        "Get phone number of supplier Tech Solutions"
-    ]
+# Counts behind the overview answers, all fetched in one SELECT
+stats_provider = StatsProvider(
+    {
+        "products": select(func.count(Product.ProductId)).scalar_subquery(),
+        "products_in_stock": select(func.count(Product.ProductId)).where(Product.Stock > 0).scalar_subquery(),
+        "categories": select(func.count(Category.CategoryId)).scalar_subquery(),
+        "brands": select(func.count(Brand.BrandId)).scalar_subquery(),
+        "users": select(func.count(User.UserId)).scalar_subquery(),
+        "suppliers": select(func.count(Supplier.SupplierId)).scalar_subquery(),
+    },
+    session_factory=SessionLocal,
+    refresh_interval=STATS_SNAPSHOT_INTERVAL
+)
 
-    for suggestion in default_suggestions:
-        existing = db.query(SuggestionDB).filter(SuggestionDB.content == suggestion).first()
-        if not existing:
-            db.add(SuggestionDB(content=suggestion))
+# create_all skips tables that already exist, so add nullable columns and indexes introduced later separately.
+# Only the chatbot's own tables are touched; the catalog tables belong to the .NET backend.
+CHATBOT_TABLES = [MessageDB.__table__, SuggestionDB.__table__, ArchivedMessageDB.__table__]
+
+def ensure_schema():
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        for table in CHATBOT_TABLES:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {quote(table.name)} ADD {quote(column.name)} {column_type} NULL"))
+    for table in CHATBOT_TABLES:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+db_ready = threading.Event()
+
+def init_db():
+    """Create missing tables and columns; runs at startup rather than on import"""
+    if db_ready.is_set():
+        return
+    Base.metadata.create_all(bind=engine)
+    ensure_schema()
+    db_ready.set()
+
+DEFAULT_SUGGESTIONS = [
+    "List all products",
+    "Show product categories",
+    "Show brands",
+    "List all users",
+    "How many products in stock?",
+    "How many suppliers?",
+    "Show out of stock products",
+    "Show user permissions",
+    "Give email id of supplier Avantika Patil",
+    "What's the price of Laptop XPS 15?",
+    "Get phone number of supplier Tech Solutions"
+]
 
-    db.commit()
-    db.close()
+# Initialize suggestions
+def initialize_suggestions(db: Optional[Session] = None):
+    owns_session = db is None
+    if owns_session:
+        db = SessionLocal()
+
+    # One lookup for all defaults, then a single bulk insert of the missing ones
+    existing = {
+        content for (content,) in
+        db.query(SuggestionDB.content).filter(SuggestionDB.content.in_(DEFAULT_SUGGESTIONS))
+    }
+    missing = [{"content": suggestion, "usage_count": 0} for suggestion in DEFAULT_SUGGESTIONS if suggestion not in existing]
+    if missing:
+        db.execute(insert(SuggestionDB), missing)
+        db.commit()
+    if owns_session:
+        db.close()
 
 # Dependency to get DB session
 def get_db():
@@ -142,16 +321,104 @@ def get_db():
     finally:
         db.close()
 
-# Load spaCy NLP model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Warning: spaCy model not found. Using small model.")
-    nlp = spacy.blank("en")
+def record_db_work(tally: QueryTally):
+    metrics.inc("request_db_queries_total", tally.queries)
+    metrics.observe("request_db_seconds", tally.seconds)
+
+def tracked(fn):
+    """Wrap sync ORM code so the queries it issues are counted as one unit of request DB work"""
+    def call(db):
+        with track_queries() as tally:
+            try:
+                return fn(db)
+            finally:
+                record_db_work(tally)
+    return call
+
+def record_request(endpoint: str, started: float, intents: Iterable[str]):
+    """Count a finished chat request's turns by intent and its latency by endpoint"""
+    for intent in intents:
+        metrics.inc("requests_total", intent=intent)
+    metrics.observe("request_seconds", time.perf_counter() - started, endpoint=endpoint)
+
+async def run_db(fn, cpu_bound: bool = False):
+    """Run sync ORM code against a fresh session without blocking the event loop.
+
+    On the async engine, fn runs through AsyncSession.run_sync: its queries await the driver,
+    but everything else in fn runs on the event loop thread. Callers that do real CPU work
+    around their queries (building chat replies: index search, formatting) pass cpu_bound
+    and always run in the thread pool.
+    """
+    if AsyncSessionLocal is not None and not cpu_bound:
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(tracked(fn))
+
+    def call():
+        db = SessionLocal()
+        try:
+            return tracked(fn)(db)
+        finally:
+            db.close()
+
+    return await run_in_threadpool(call)
+
+# Bounded pool for CPU-bound spaCy work so parsing never runs on the event loop
+nlp_executor = ThreadPoolExecutor(max_workers=NLP_THREADS, thread_name_prefix="nlp")
+
+async def run_nlp(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(nlp_executor, fn, *args)
+
+# Optional process pool so parsing scales past one core per API process
+nlp_pool = None
+if NLP_WORKERS > 0:
+    nlp_pool = NLPWorkerPool(
+        NLP_WORKERS,
+        batch_size=NLP_WORKER_BATCH_SIZE,
+        max_pending=NLP_MAX_PENDING,
+        start_method=NLP_WORKER_START_METHOD
+    )
+
+# Optional in-process micro-batching of concurrent messages through nlp.pipe
+nlp_batcher = None
+if NLP_MICRO_BATCHING and nlp_pool is None:
+    nlp_batcher = MicroBatcher(
+        analyze_batch,
+        max_batch_size=NLP_BATCH_MAX_SIZE,
+        max_wait_ms=NLP_BATCH_MAX_WAIT_MS,
+        executor=nlp_executor
+    )
+
+async def analyze_async(message: str) -> MessageAnalysis:
+    """Run the NLP stage on the worker pool or micro-batcher when enabled, otherwise on the NLP thread pool"""
+    started = time.perf_counter()
+    # Rule-settled messages are answered here without a trip to the NLP workers
+    if NLP_PROFILE == "regex":
+        analysis = analyze_with_rules(message)
+        if analysis is not None:
+            record_nlp_metrics("regex", time.perf_counter() - started, analysis)
+            return analysis
+    if nlp_pool is not None:
+        analysis = await asyncio.wrap_future(nlp_pool.submit(message))
+    elif nlp_batcher is not None:
+        analysis = await nlp_batcher.submit(message)
+    else:
+        analysis = await run_nlp(analyze_message, message)
+    record_nlp_metrics("spacy", time.perf_counter() - started, analysis)
+    return analysis
+
+def record_nlp_metrics(tier: str, seconds: float, analysis: MessageAnalysis):
+    tier_stats.record(tier, seconds)
+    metrics.observe("nlp_seconds", seconds, tier=tier)
+    # Stage timings are measured where the analysis ran, which may be an NLP worker process
+    for stage, stage_seconds in analysis.timings.items():
+        metrics.observe("nlp_stage_seconds", stage_seconds, stage=stage)
 
 # Models
 class MessageRequest(BaseModel):
     message: str
+    # Omit to start a new conversation; the reply carries the id to send next time
+    conversation_id: Optional[str] = None
 
 class Entity(BaseModel):
     label: str
@@ -160,7 +427,18 @@ class Entity(BaseModel):
 class ChatbotResponse(BaseModel):
     message: str
     entities: List[Entity] = []
-    message_id: int
+    # None when messages are written behind and have no id yet
+    message_id: Optional[int] = None
+    conversation_id: Optional[str] = None
+
+class BatchMessageRequest(BaseModel):
+    messages: List[str]
+    conversation_id: Optional[str] = None
+
+class BatchChatbotResponse(BaseModel):
+    # One result per request message, in request order
+    responses: List[ChatbotResponse]
+    conversation_id: str
 
 class SuggestionsResponse(BaseModel):
     suggestions: List[str]
@@ -173,161 +451,169 @@ class Message(BaseModel):
 
 class MessageHistoryResponse(BaseModel):
     messages: List[Message]
+    # Pass back as ?cursor= to fetch the next (older) page; None on the last page
+    next_cursor: Optional[str] = None
 
-# Improved entity extraction function
-def extract_entities(message: str) -> Dict[str, Any]:
-    doc = nlp(message)
-    entities = {}
-
-    # Extract product names, categories, numbers, etc.
-    # Look for product names after terms like "find" or "search"
-    product_search_patterns = [r"find\s+([\w\s]+)", r"search\s+for\s+([\w\s]+)", r"looking\s+for\s+([\w\s]+)"]
-    for pattern in product_search_patterns:
-        match = re.search(pattern, message, re.IGNORECASE)
-        if match:
-            entities["product_name"] = match.group(1).strip()
-            break
-
-    # Extract supplier name pattern
-    supplier_patterns = [
-        r"(?:supplier|vendor)\s+([A-Za-z\s]+?)(?:\s+(?:email|phone|contact|address)|$)",
-        r"(?:email|phone|contact|address)\s+(?:of|for)\s+(?:supplier|vendor)\s+([A-Za-z\s]+)(?:\?|$)",
-        r"(?:email|phone|contact|address)\s+(?:of|for)\s+([A-Za-z\s]+)(?:\?|$)"
-    ]
-
-    for pattern in supplier_patterns:
-        match = re.search(pattern, message, re.IGNORECASE)
-        if match:
-            entities["supplier_name"] = match.group(1).strip()
-            break
-
-    # Extract product price pattern
-    price_patterns = [
-        r"price\s+of\s+([\w\s\d]+?)(?:\?|$)",
-        r"how\s+much\s+(?:is|does|costs?)\s+([\w\s\d]+?)(?:\?|$)",
-        r"what(?:'s|\s+is)\s+the\s+price\s+of\s+([\w\s\d]+?)(?:\?|$)"
-    ]
-
-    for pattern in price_patterns:
-        match = re.search(pattern, message, re.IGNORECASE)
-        if match:
-            entities["product_name"] = match.group(1).strip()
-            break
-
-    # Extract what attribute/field they're looking for
-    field_patterns = {
-        "email": [r"email\s+(?:id|address)", r"e-?mail"],
-        "phone": [r"phone\s+(?:number|no\.?)", r"contact\s+number"],
-        "address": [r"address", r"location"],
-        "price": [r"price", r"cost", r"how much"],
-        "stock": [r"stock", r"inventory", r"available"]
-    }
-
-    for field, patterns in field_patterns.items():
-        for pattern in patterns:
-            if re.search(pattern, message, re.IGNORECASE):
-                entities["requested_field"] = field
-                break
-        if "requested_field" in entities:
-            break
-
-    # Extract numbers for potential quantities or IDs
-    quantity_pattern = r"(\d+)\s+(?:products?|items?|users?)"
-    match = re.search(quantity_pattern, message, re.IGNORECASE)
-    if match:
-        entities["quantity"] = int(match.group(1))
-
-    # If no specific product name was found, try to find noun chunks
-    if "product_name" not in entities and "supplier_name" not in entities:
-        for chunk in doc.noun_chunks:
-            # Skip chunks that are likely not product or supplier names
-            skip_terms = ["product", "category", "user", "database", "list", "all", "email", "phone"]
-            if not any(term in chunk.text.lower() for term in skip_terms):
-                # Check if this could be a proper name (potential supplier)
-                is_proper = any(token.pos_ == "PROPN" for token in chunk)
-                if is_proper:
-                    entities["supplier_name"] = chunk.text
-                else:
-                    entities["product_name"] = chunk.text
-                break
-
-    return entities
-
-# Determine user intent from message
-def classify_intent(message: str) -> str:
-    message_lower = message.lower()
-
-    for intent, patterns in INTENT_PATTERNS.items():
-        for pattern in patterns:
-            if re.search(pattern, message_lower, re.IGNORECASE):
-                return intent
-
-    # Check if query is about specific supplier info
-    if re.search(r"(email|phone|contact|address)\s+(?:of|for|details)", message_lower):
-        return "supplier_contact"
-
-    # Check if query is about product price
-    if re.search(r"(price|cost|how much)", message_lower):
-        return "product_price"
-
-    return "unknown"
+class CacheInvalidateRequest(BaseModel):
+    # Table names as in the database; omit to clear the whole cache
+    tables: Optional[List[str]] = None
 
 # Enhanced database query functions
-def get_products(db: Session, limit: int = 10):
-    return db.query(Product).limit(limit).all()
+# List intents select only the columns their reply prints; iter_listing streams the rows
+# in yield_per chunks and stops at LIST_RESULT_LIMIT
+def get_products(db: Session):
+    return db.query(Product.Name, Product.Price, Product.Stock)
 
 def get_categories(db: Session):
-    return db.query(Category).all()
+    return db.query(Category.CategoryName, Category.Description)
 
 def get_brands(db: Session):
-    return db.query(Brand).all()
+    return db.query(Brand.BrandName, Brand.Description)
 
-def get_users(db: Session, limit: int = 10):
-    return db.query(User).limit(limit).all()
+def get_users(db: Session):
+    return db.query(User.Username, User.FirstName, User.LastName, User.Email)
 
 def get_suppliers(db: Session):
-    return db.query(Supplier).all()
-
-def get_products_count(db: Session):
-    return db.query(func.count(Product.ProductId)).scalar()
-
-def get_products_in_stock_count(db: Session):
-    return db.query(func.count(Product.ProductId)).filter(Product.Stock > 0).scalar()
+    return db.query(Supplier.Name, Supplier.Email, Supplier.Phone)
 
 def get_out_of_stock_products(db: Session):
-    return db.query(Product).filter(Product.Stock == 0).all()
+    return db.query(Product.Name).filter(Product.Stock == 0)
 
 def get_product_by_category(db: Session, category_id: int):
     return db.query(Product).filter(Product.CategoryId == category_id).all()
 
 def get_user_permissions(db: Session, user_id: int = None):
+    query = db.query(
+        UserPermission.UserId, UserPermission.ModuleName,
+        UserPermission.CanCreate, UserPermission.CanRead, UserPermission.CanUpdate, UserPermission.CanDelete
+    )
     if user_id:
-        return db.query(UserPermission).filter(UserPermission.UserId == user_id).all()
-    return db.query(UserPermission).all()
+        query = query.filter(UserPermission.UserId == user_id)
+    return query
+
+def iter_listing(query, header: str, empty: str, format_row: Callable, limit: int = LIST_RESULT_LIMIT) -> Iterator[str]:
+    """Yield the header with the first row, then a line per row as rows arrive, then '…and N more'"""
+    shown = 0
+    more = False
+    # Read the (at most limit + 1) rows to the end so the streaming cursor is closed before the count
+    for row in query.limit(limit + 1).yield_per(LIST_YIELD_PER):
+        if shown == limit:
+            more = True
+            continue
+        yield (f"{header}\n" if shown == 0 else "\n") + format_row(row)
+        shown += 1
+    if not shown:
+        yield empty
+    elif more:
+        # Only count the full result when the cap is actually hit
+        yield f"\n- …and {query.order_by(None).count() - limit} more"
+
+# Row-level changes to the catalog tables, polled by UpdatedAt and fed to the in-process structures below
+change_feed = ChangeFeed(SessionLocal, interval=CHANGE_FEED_INTERVAL, full_resync=CHANGE_FEED_FULL_RESYNC)
+for model in (Brand, Category, Product, Supplier):
+    change_feed.watch(model)
+change_feed.watch(User, ("UserId", "Username", "Email", "FirstName", "LastName", "IsActive"))
+
+# In-process fuzzy name indexes, loaded in full once and then updated from the change feed
+product_index = NameIndex()
+supplier_index = NameIndex()
+if SEARCH_INDEX_ENABLED:
+    change_feed.subscribe(Product.__tablename__, index_subscriber(
+        product_index, "ProductId", lambda row: (row.Name, row.Category)
+    ))
+    change_feed.subscribe(Supplier.__tablename__, index_subscriber(
+        supplier_index, "SupplierId", lambda row: (row.Name,)
+    ))
+
+def get_by_ranked_keys(db: Session, model, pk, keys: List[int]):
+    """Load rows for index hits, keeping the index's ranking"""
+    if not keys:
+        return []
+    rows = {getattr(row, pk.key): row for row in db.query(model).filter(pk.in_(keys)).all()}
+    return [rows[key] for key in keys if key in rows]
+
+def get_product_by_name(db: Session, name: str, limit: int = 10):
+    # Ranked fuzzy search on the name index; tolerates typos
+    if SEARCH_INDEX_ENABLED and product_index.ready:
+        keys = [key for key, _ in product_index.search(name, limit)]
+        products = get_by_ranked_keys(db, Product, Product.ProductId, keys)
+        if products:
+            return products
 
-def get_product_by_name(db: Session, name: str):
-    # Improved search with OR condition and fuzzy matching
+    # Index not loaded yet, or it has no match (e.g. a row added since its last refresh):
+    # substring search on name or category, best match first
     search_term = f"%{name}%"
-    return db.query(Product).filter(
+    products = db.query(Product).filter(
         or_(
             Product.Name.like(search_term),
             Product.Category.like(search_term)
         )
     ).all()
+    return rank_by_similarity(products, name, lambda product: (product.Name, product.Category))[:limit]
 
-def get_supplier_by_name(db: Session, name: str):
-    # Fuzzy search for supplier by name
-    search_term = f"%{name}%"
-    return db.query(Supplier).filter(Supplier.Name.like(search_term)).all()
+def get_supplier_by_name(db: Session, name: str, limit: int = 10):
+    # Ranked fuzzy search on the name index; tolerates typos
+    if SEARCH_INDEX_ENABLED and supplier_index.ready:
+        keys = [key for key, _ in supplier_index.search(name, limit)]
+        suppliers = get_by_ranked_keys(db, Supplier, Supplier.SupplierId, keys)
+        if suppliers:
+            return suppliers
 
-def find_specific_product_attribute(db: Session, product_name: str, attribute: str):
-    """Find a specific attribute of a product by name"""
-    products = get_product_by_name(db, product_name)
-    if not products:
+    # Index not loaded yet, or it has no match (e.g. a row added since its last refresh):
+    # substring search on name, best match first
+    search_term = f"%{name}%"
+    suppliers = db.query(Supplier).filter(Supplier.Name.like(search_term)).all()
+    return rank_by_similarity(suppliers, name, lambda supplier: (supplier.Name,))[:limit]
+
+# Column-oriented copies of the rows attribute questions read, so they need no query
+catalog = CatalogSnapshots({
+    Product.__tablename__: SnapshotSpec("ProductId", "Name", ("ProductId", "Name", "Price", "Stock", "Category")),
+    Supplier.__tablename__: SnapshotSpec("SupplierId", "Name", ("SupplierId", "Name", "Email", "Phone", "Address")),
+})
+if CATALOG_SNAPSHOT_ENABLED:
+    catalog.subscribe(change_feed)
+
+def product_texts(product):
+    return (product.Name, product.Category)
+
+def supplier_texts(supplier):
+    return (supplier.Name,)
+
+def closest_match(rows: Iterable, name: str, texts: Callable):
+    """First of the ranked rows that the name really refers to. Attribute answers quote one row,
+    so they need a tighter match than search listings: a fuzzy hit like "Laptop Pro 2000" for
+    "Laptop XPS 15" would answer with another product's data."""
+    for row in rows:
+        if any(is_close_match(name, text) for text in texts(row) if text):
+            return row
+    return None
+
+def find_in_catalog(model, index: NameIndex, name: str, texts: Callable):
+    """Best match for a name from the catalog snapshot, or None when the database must be asked"""
+    snapshot = catalog.get(model.__tablename__)
+    if snapshot is None:
         return None
-
-    # Return the requested attribute for the first matching product
-    product = products[0]
+    record = snapshot.find(name)
+    if record is None and SEARCH_INDEX_ENABLED and index.ready:
+        # A key the snapshot hasn't caught up with yet is skipped, and may be found in the database
+        records = (snapshot.get(key) for key, _ in index.search(name, 5))
+        record = closest_match((record for record in records if record is not None), name, texts)
+    return record
+
+def find_product(db: Session, name: str):
+    product = find_in_catalog(Product, product_index, name, product_texts)
+    if product is not None:
+        return product
+    # Results are ranked, so the first close match is the best one
+    return closest_match(get_product_by_name(db, name), name, product_texts)
+
+def find_supplier(db: Session, name: str):
+    supplier = find_in_catalog(Supplier, supplier_index, name, supplier_texts)
+    if supplier is not None:
+        return supplier
+    return closest_match(get_supplier_by_name(db, name), name, supplier_texts)
+
+def product_attribute(product, attribute: str):
     if attribute == "price":
         return product.Price
     elif attribute == "stock":
@@ -337,14 +623,7 @@ def find_specific_product_attribute(db: Session, product_name: str, attribute: s
     else:
         return None
 
-def find_specific_supplier_attribute(db: Session, supplier_name: str, attribute: str):
-    """Find a specific attribute of a supplier by name"""
-    suppliers = get_supplier_by_name(db, supplier_name)
-    if not suppliers:
-        return None
-
-    # Return the requested attribute for the first matching supplier
-    supplier = suppliers[0]
+def supplier_attribute(supplier, attribute: str):
     if attribute == "email":
         return supplier.Email
     elif attribute == "phone":
@@ -354,236 +633,434 @@ def find_specific_supplier_attribute(db: Session, supplier_name: str, attribute:
     else:
         return None
 
-# Enhanced response generation function
-def generate_response(message: str, db: Session) -> str:
-    # Extract entities and determine intent
-    entities = extract_entities(message)
-    intent = classify_intent(message)
-
-    # Handle specific supplier contact information requests
-    if intent == "supplier_contact" and "supplier_name" in entities:
-        supplier_name = entities["supplier_name"]
-        field = entities.get("requested_field", "email")  # Default to email if not specified
-        
-        attribute = find_specific_supplier_attribute(db, supplier_name, field)
-        if attribute:
-            field_name = "email address" if field == "email" else field + " number" if field == "phone" else field
-            return f"The {field_name} of supplier {supplier_name} is: {attribute}"
-        else:
-            return f"Sorry, I couldn't find the {field} for supplier '{supplier_name}'. Please check the name and try again."
+response_cache = ResponseCache(max_entries=RESPONSE_CACHE_SIZE, ttl_seconds=RESPONSE_CACHE_TTL)
+
+def invalidate_replies(changes: TableChanges):
+    response_cache.invalidate([changes.table])
+
+# Cached replies built from a catalog table are dropped as soon as the change feed sees it change,
+# rather than living out their TTL
+if response_cache.enabled:
+    for model in (Brand, Category, Product, User, Supplier):
+        change_feed.subscribe(model.__tablename__, invalidate_replies)
+
+# Reply handlers by intent. Handlers that declare the tables they read are cached; intents
+# without a handler (or missing the slot their handler needs) go to the fallbacks at the end.
+intent_router = IntentRouter()
+
+# Rendered rows of the larger listings, re-rendered only when the row's UpdatedAt moves
+fragment_store = FragmentStore(max_entries=LIST_FRAGMENT_CACHE_SIZE)
+
+def register_listing(intent: str, query: Callable, model, header: str, empty: str, format_row: Callable,
+                     fragments: bool = False):
+    """Handler for an intent that lists rows, streamed row by row by iter_listing.
+
+    With fragments, each row's line is served from the fragment store while the row is unchanged.
+    """
+    table = model.__tablename__
+    if fragments and fragment_store.enabled:
+        key = list(model.__table__.primary_key.columns)[0]
+        versioned = "UpdatedAt" in model.__table__.c
+        extra_columns = [key, model.__table__.c.UpdatedAt] if versioned else [key]
+        list_rows = lambda db: query(db).add_columns(*extra_columns)
+        format_row = fragment_store.renderer(intent, format_row, versioned)
+    else:
+        list_rows = query
+    intent_router.add(IntentHandler(
+        intent,
+        lambda message, db, analysis: iter_listing(list_rows(db), header, empty, format_row),
+        tables=(table,)
+    ))
+
+def format_permission(perm) -> str:
+    return (
+        f"- User {perm.UserId}, Module: {perm.ModuleName}, "
+        f"Rights: {'C' if perm.CanCreate else '-'}"
+        f"{'R' if perm.CanRead else '-'}"
+        f"{'U' if perm.CanUpdate else '-'}"
+        f"{'D' if perm.CanDelete else '-'}"
+    )
 
-    # Handle specific product price requests
-    if intent == "product_price" and "product_name" in entities:
-        product_name = entities["product_name"]
-        field = entities.get("requested_field", "price")  # Default to price if not specified
-        
-        attribute = find_specific_product_attribute(db, product_name, field)
-        if attribute:
-            return f"The {field} of {product_name} is: {attribute}"
-        else:
-            return f"Sorry, I couldn't find the {field} for product '{product_name}'. Please check the name and try again."
+register_listing(
+    "list_products", get_products, Product,
+    "Here are the products in our database:", "No products found in the database.",
+    lambda product: f"- {product.Name}: ${product.Price}, Stock: {product.Stock}",
+    fragments=True
+)
+register_listing(
+    "product_categories", get_categories, Category,
+    "Here are the product categories:", "No product categories found in the database.",
+    lambda category: f"- {category.CategoryName}: {category.Description}"
+)
+register_listing(
+    "out_of_stock", get_out_of_stock_products, Product,
+    "Out of stock products:", "All products are currently in stock.",
+    lambda product: f"- {product.Name}"
+)
+register_listing(
+    "brands", get_brands, Brand,
+    "Here are the brands in our database:", "No brands found in the database.",
+    lambda brand: f"- {brand.BrandName}: {brand.Description}",
+    fragments=True
+)
+register_listing(
+    "list_users", get_users, User,
+    "Here are the users in our system:", "No users found in the database.",
+    lambda user: f"- {user.Username} ({user.FirstName} {user.LastName}, {user.Email})",
+    fragments=True
+)
+register_listing(
+    "user_permissions", get_user_permissions, UserPermission,
+    "User permissions:", "No user permissions found in the database.",
+    format_permission,
+    fragments=True
+)
+register_listing(
+    "suppliers", get_suppliers, Supplier,
+    "Here are our suppliers:", "No suppliers found in the database.",
+    lambda supplier: f"- {supplier.Name} (Email: {supplier.Email}, Phone: {supplier.Phone})",
+    fragments=True
+)
 
-    # Handle different intents
-    if intent == "list_products":
-        products = get_products(db)
-        if products:
-            product_list = "\n".join([f"- {product.Name}: ${product.Price}, Stock: {product.Stock}" for product in products])
-            return f"Here are the products in our database:\n{product_list}"
-        return "No products found in the database."
-
-    elif intent == "product_categories":
-        categories = get_categories(db)
-        if categories:
-            category_list = "\n".join([f"- {category.CategoryName}: {category.Description}" for category in categories])
-            return f"Here are the product categories:\n{category_list}"
-        return "No product categories found in the database."
-
-    elif intent == "out_of_stock":
-        out_of_stock = get_out_of_stock_products(db)
-        if out_of_stock:
-            product_list = "\n".join([f"- {product.Name}" for product in out_of_stock])
-            return f"Out of stock products:\n{product_list}"
-        return "All products are currently in stock."
-
-    elif intent == "product_count":
-        count = get_products_count(db)
-        in_stock = get_products_in_stock_count(db)
-        return f"There are {count} products in total, with {in_stock} currently in stock."
-
-    elif intent == "brands":
-        brands = get_brands(db)
-        if brands:
-            brand_list = "\n".join([f"- {brand.BrandName}: {brand.Description}" for brand in brands])
-            return f"Here are the brands in our database:\n{brand_list}"
-        return "No brands found in the database."
-
-    elif intent == "list_users":
-        users = get_users(db)
-        if users:
-            user_list = "\n".join([f"- {user.Username} ({user.FirstName} {user.LastName}, {user.Email})" for user in users])
-            return f"Here are the users in our system:\n{user_list}"
-        return "No users found in the database."
-
-    elif intent == "user_permissions":
-        permissions = get_user_permissions(db)
-        if permissions:
-            perm_list = "\n".join([
-                f"- User {perm.UserId}, Module: {perm.ModuleName}, "
-                f"Rights: {'C' if perm.CanCreate else '-'}"
-                f"{'R' if perm.CanRead else '-'}"
-                f"{'U' if perm.CanUpdate else '-'}"
-                f"{'D' if perm.CanDelete else '-'}"
-                for perm in permissions
-            ])
-            return f"User permissions:\n{perm_list}"
-        return "No user permissions found in the database."
-
-    elif intent == "suppliers":
-        suppliers = get_suppliers(db)
-        if suppliers:
-            supplier_list = "\n".join([f"- {supplier.Name} (Email: {supplier.Email}, Phone: {supplier.Phone})" for supplier in suppliers])
-            return f"Here are our suppliers:\n{supplier_list}"
-        return "No suppliers found in the database."
+# Handle specific supplier contact information requests
+@intent_router.handler("supplier_contact", requires="supplier_name")
+def supplier_contact_reply(message: str, db: Session, analysis: MessageAnalysis) -> str:
+    supplier_name = analysis.entities["supplier_name"]
+    field = analysis.entities.get("requested_field", "email")  # Default to email if not specified
+
+    supplier = find_supplier(db, supplier_name)
+    attribute = supplier_attribute(supplier, field) if supplier is not None else None
+    if attribute:
+        field_name = "email address" if field == "email" else field + " number" if field == "phone" else field
+        # Name the supplier that matched, which may be spelled differently from the question
+        return f"The {field_name} of supplier {supplier.Name} is: {attribute}"
+    return f"Sorry, I couldn't find the {field} for supplier '{supplier_name}'. Please check the name and try again."
+
+# Handle specific product price requests
+@intent_router.handler("product_price", requires="product_name")
+def product_price_reply(message: str, db: Session, analysis: MessageAnalysis) -> str:
+    product_name = analysis.entities["product_name"]
+    field = analysis.entities.get("requested_field", "price")  # Default to price if not specified
+
+    product = find_product(db, product_name)
+    attribute = product_attribute(product, field) if product is not None else None
+    if attribute:
+        # Name the product that matched, which may be spelled differently from the question
+        return f"The {field} of {product.Name} is: {attribute}"
+    return f"Sorry, I couldn't find the {field} for product '{product_name}'. Please check the name and try again."
+
+@intent_router.handler("product_count", tables=(Product.__tablename__,))
+def product_count_reply(message: str, db: Session, analysis: MessageAnalysis) -> str:
+    counts = stats_provider.counts(db)
+    return f"There are {counts['products']} products in total, with {counts['products_in_stock']} currently in stock."
+
+@intent_router.handler("product_search", requires="product_name")
+def product_search_reply(message: str, db: Session, analysis: MessageAnalysis) -> str:
+    product_name = analysis.entities["product_name"]
+    products = get_product_by_name(db, product_name)
+    if products:
+        product_list = "\n".join([f"- {product.Name}: ${product.Price}, Stock: {product.Stock}" for product in products])
+        return f"Found these products matching '{product_name}':\n{product_list}"
+    return f"No products found matching '{product_name}'."
+
+@intent_router.handler("database_info", tables=(
+    Product.__tablename__, Category.__tablename__, Brand.__tablename__, User.__tablename__, Supplier.__tablename__
+))
+def database_info_reply(message: str, db: Session, analysis: MessageAnalysis) -> str:
+    counts = stats_provider.counts(db)
+    return (
+        f"Database overview:\n"
+        f"- {counts['products']} products\n"
+        f"- {counts['categories']} product categories\n"
+        f"- {counts['brands']} brands\n"
+        f"- {counts['users']} users\n"
+        f"- {counts['suppliers']} suppliers"
+    )
 
-    elif intent == "product_search" and "product_name" in entities:
-        product_name = entities["product_name"]
-        products = get_product_by_name(db, product_name)
-        if products:
-            product_list = "\n".join([f"- {product.Name}: ${product.Price}, Stock: {product.Stock}" for product in products])
-            return f"Found these products matching '{product_name}':\n{product_list}"
-        return f"No products found matching '{product_name}'."
-
-    elif intent == "database_info":
-        product_count = get_products_count(db)
-        category_count = db.query(func.count(Category.CategoryId)).scalar()
-        brand_count = db.query(func.count(Brand.BrandId)).scalar()
-        user_count = db.query(func.count(User.UserId)).scalar()
-        supplier_count = db.query(func.count(Supplier.SupplierId)).scalar()
-        
-        return (
-            f"Database overview:\n"
-            f"- {product_count} products\n"
-            f"- {category_count} product categories\n"
-            f"- {brand_count} brands\n"
-            f"- {user_count} users\n"
-            f"- {supplier_count} suppliers"
-        )
+@intent_router.handler("help")
+def help_reply(message: str, db: Session, analysis: MessageAnalysis) -> str:
+    return (
+        "I can help you with information from our e-commerce database. Try asking:\n"
+        "- List all products\n"
+        "- Show product categories\n"
+        "- Show brands\n"
+        "- List all users\n"
+        "- Show out of stock products\n"
+        "- How many products do we have?\n"
+        "- Show user permissions\n"
+        "- Show suppliers\n"
+        "- Search for a specific product\n"
+        "- Give me the email id of supplier [Name]\n"
+        "- What's the price of [Product Name]?\n"
+        "- Get phone number of supplier [Name]"
+    )
 
-    elif intent == "help":
-        return (
-            "I can help you with information from our e-commerce database. Try asking:\n"
-            "- List all products\n"
-            "- Show product categories\n"
-            "- Show brands\n"
-            "- List all users\n"
-            "- Show out of stock products\n"
-            "- How many products do we have?\n"
-            "- Show user permissions\n"
-            "- Show suppliers\n"
-            "- Search for a specific product\n"
-            "- Give me the email id of supplier [Name]\n"
-            "- What's the price of [Product Name]?\n"
-            "- Get phone number of supplier [Name]"
-        )
+# If we detected a product name but no other intent, assume product search
+intent_router.fallback("product_name", requires="product_name")(product_search_reply)
 
-    # If we detected a product name but no other intent, assume product search
-    elif "product_name" in entities:
-        product_name = entities["product_name"]
-        products = get_product_by_name(db, product_name)
-        if products:
-            product_list = "\n".join([f"- {product.Name}: ${product.Price}, Stock: {product.Stock}" for product in products])
-            return f"Found these products matching '{product_name}':\n{product_list}"
-        return f"No products found matching '{product_name}'."
-
-    # If we detected a supplier name but no other intent, assume supplier search
-    elif "supplier_name" in entities:
-        supplier_name = entities["supplier_name"]
-        suppliers = get_supplier_by_name(db, supplier_name)
-        if suppliers:
-            supplier_list = "\n".join([
-                f"- Name: {supplier.Name}\n  Email: {supplier.Email}\n  Phone: {supplier.Phone}\n  Address: {supplier.Address}"
-                for supplier in suppliers
-            ])
-            return f"Found supplier information for '{supplier_name}':\n{supplier_list}"
-        return f"No suppliers found matching '{supplier_name}'."
-
-    # Default response
+# If we detected a supplier name but no other intent, assume supplier search
+@intent_router.fallback("supplier_name", requires="supplier_name")
+def supplier_search_reply(message: str, db: Session, analysis: MessageAnalysis) -> str:
+    supplier_name = analysis.entities["supplier_name"]
+    suppliers = get_supplier_by_name(db, supplier_name)
+    if suppliers:
+        supplier_list = "\n".join([
+            f"- Name: {supplier.Name}\n  Email: {supplier.Email}\n  Phone: {supplier.Phone}\n  Address: {supplier.Address}"
+            for supplier in suppliers
+        ])
+        return f"Found supplier information for '{supplier_name}':\n{supplier_list}"
+    return f"No suppliers found matching '{supplier_name}'."
+
+# Default response
+@intent_router.fallback("default")
+def default_reply(message: str, db: Session, analysis: MessageAnalysis) -> str:
     return (
         f"I received your message: '{message}'. I can provide information about products, "
         f"categories, brands, users, and suppliers in our database. Type 'help' to see what I can do."
     )
 
-# Endpoints
-@app.post("/chatbot", response_model=ChatbotResponse)
-async def chatbot(data: MessageRequest, db: Session = Depends(get_db)):
-    try:
-        user_message = data.message.strip()
+def stream_response(message: str, db: Session, analysis: Optional[MessageAnalysis] = None) -> Iterator[str]:
+    """Yield the reply in pieces, serving it from and storing it in the response cache"""
+    # Extract entities and determine intent, reusing the caller's analysis if given
+    if analysis is None:
+        analysis = analyze_message(message)
+
+    handler = intent_router.resolve(analysis.intent, analysis.entities)
+    if not handler.tables or not response_cache.enabled:
+        yield from intent_router.dispatch(handler, message, db, analysis)
+        return
+
+    cached, versions = response_cache.get(analysis.intent, analysis.entities, handler.tables)
+    if cached is not None:
+        yield cached
+        return
+    pieces = []
+    for piece in intent_router.dispatch(handler, message, db, analysis):
+        pieces.append(piece)
+        yield piece
+    response_cache.put(analysis.intent, analysis.entities, versions, "".join(pieces))
+
+def generate_response(message: str, db: Session, analysis: Optional[MessageAnalysis] = None) -> str:
+    return "".join(stream_response(message, db, analysis))
+
+# Optional write-behind buffer for chat messages
+message_writer = None
+if MESSAGE_WRITE_BEHIND:
+    message_writer = WriteBehindBuffer(
+        SessionLocal,
+        MessageDB,
+        batch_size=MESSAGE_FLUSH_BATCH,
+        flush_interval_ms=MESSAGE_FLUSH_INTERVAL_MS,
+        max_queue=MESSAGE_QUEUE_SIZE
+    )
+
+# Suggestion usage counted in memory and flushed to the suggestions table periodically
+suggestion_ranker = SuggestionRanker(SessionLocal, SuggestionDB, top_k=6, flush_interval=SUGGESTION_FLUSH_INTERVAL)
+
+# Persist one chat turn and build the API response
+def save_chat_turns(db: Session, turns: List[tuple], conversation_id: str) -> List[Optional[int]]:
+    """Persist the (user message, bot reply, received at) turns and count suggestion usage in one
+    transaction; returns the bot message ids"""
+    rows = []
+    replied_at = datetime.datetime.utcnow()
+    tick = datetime.timedelta(microseconds=1)
+    last = None
+    for user_message, bot_response, received_at in turns:
+        # Strictly increasing per row, so /history (ordered by timestamp, id) shows each reply right
+        # after its question even when a batch's turns share one received_at
+        user_at = received_at if last is None else max(received_at, last + tick)
+        last = max(replied_at, user_at + tick)
+        rows.append({"content": user_message, "is_user": 1, "timestamp": user_at, "conversation_id": conversation_id})
+        rows.append({"content": bot_response, "is_user": 0, "timestamp": last, "conversation_id": conversation_id})
 
-        if not user_message:
-            raise HTTPException(status_code=400, detail="No message provided")
-        
-        # Save user message to database
-        user_msg_db = MessageDB(content=user_message, is_user=1)
-        db.add(user_msg_db)
-        db.commit()
-        db.refresh(user_msg_db)
-        
-        # Process the message with spaCy
-        doc = nlp(user_message)
-        entities = [{"label": ent.label_, "text": ent.text} for ent in doc.ents]
-        
-        # Generate bot response
-        bot_response = generate_response(user_message, db)
-        
-        # Save bot response to database
-        bot_msg_db = MessageDB(content=bot_response, is_user=0)
-        db.add(bot_msg_db)
-        db.commit()
-        db.refresh(bot_msg_db)
-        
         # Update suggestion usage if the message matches any suggestion
-        suggestion = db.query(SuggestionDB).filter(SuggestionDB.content == user_message).first()
-        if suggestion:
-            suggestion.usage_count += 1
+        if suggestion_ranker.ready:
+            suggestion_ranker.record(user_message)
+        else:
+            suggestion = db.query(SuggestionDB).filter(SuggestionDB.content == user_message).first()
+            if suggestion:
+                suggestion.usage_count += 1
+
+    if message_writer is not None and message_writer.add(rows):
+        if db.dirty:
             db.commit()
-        
-        return ChatbotResponse(
-            message=bot_response,
-            entities=entities,
-            message_id=bot_msg_db.id
-        )
+        return [None] * len(turns)
+
+    # Save all messages and any usage bumps in one transaction
+    messages = [MessageDB(**row) for row in rows]
+    db.add_all(messages)
+    db.flush()
+    # Read the ids before the commit expires the instances, which would reload each one
+    bot_ids = [bot_msg_db.id for bot_msg_db in messages[1::2]]
+    db.commit()
+    return bot_ids
+
+def save_chat_turn(db: Session, user_message: str, bot_response: str,
+                   received_at: datetime.datetime, conversation_id: str) -> Optional[int]:
+    """Persist both messages of a turn; returns the bot message id"""
+    return save_chat_turns(db, [(user_message, bot_response, received_at)], conversation_id)[0]
+
+def process_chat_turn(db: Session, user_message: str, analysis: MessageAnalysis,
+                      conversation_id: str) -> ChatbotResponse:
+    received_at = datetime.datetime.utcnow()
+
+    # Generate bot response
+    with metrics.timer("stage_seconds", stage="reply"):
+        bot_response = generate_response(user_message, db, analysis)
+    with metrics.timer("stage_seconds", stage="persist"):
+        message_id = save_chat_turn(db, user_message, bot_response, received_at, conversation_id)
+
+    return ChatbotResponse(
+        message=bot_response,
+        entities=analysis.spacy_entities,
+        message_id=message_id,
+        conversation_id=conversation_id
+    )
+
+def reply_key(message: str, analysis: MessageAnalysis) -> tuple:
+    """Messages with equal keys get the same reply. Only the fallback reply quotes the message,
+    and it is never used for rule-only intents or once a product or supplier name was found."""
+    key = (analysis.intent, tuple(sorted(analysis.entities.items())))
+    entities = analysis.entities
+    if analysis.intent in RULE_ONLY_INTENTS or "product_name" in entities or "supplier_name" in entities:
+        return key
+    return key + (message,)
+
+def process_chat_batch(db: Session, messages: List[str], analyses: List[MessageAnalysis],
+                       conversation_id: str) -> BatchChatbotResponse:
+    received_at = datetime.datetime.utcnow()
+
+    # Build each distinct reply once, so repeated questions cost one set of queries
+    replies: Dict[tuple, str] = {}
+    for message, analysis in zip(messages, analyses):
+        key = reply_key(message, analysis)
+        if key not in replies:
+            replies[key] = generate_response(message, db, analysis)
+    bot_responses = [replies[reply_key(message, analysis)] for message, analysis in zip(messages, analyses)]
+
+    message_ids = save_chat_turns(
+        db, [(message, bot_response, received_at) for message, bot_response in zip(messages, bot_responses)],
+        conversation_id
+    )
+    return BatchChatbotResponse(
+        responses=[
+            ChatbotResponse(
+                message=bot_response,
+                entities=analysis.spacy_entities,
+                message_id=message_id,
+                conversation_id=conversation_id
+            )
+            for bot_response, analysis, message_id in zip(bot_responses, analyses, message_ids)
+        ],
+        conversation_id=conversation_id
+    )
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_chat_turn(user_message: str, analysis: MessageAnalysis, conversation_id: str,
+                     started: float) -> Iterator[str]:
+    """Server-sent events for one turn: start, a chunk per reply piece as rows arrive, then done.
+
+    The turn is persisted after the last chunk has been sent, so listings start rendering
+    before the insert. If the client disconnects mid-reply the turn is not saved.
+    """
+    received_at = datetime.datetime.utcnow()
+    db = SessionLocal()
+    # Each next() runs in its own context, so queries are counted step by step into one tally
+    tally = QueryTally()
+    try:
+        yield sse_event("start", {"conversation_id": conversation_id, "entities": analysis.spacy_entities})
+        pieces = []
+        reply = stream_response(user_message, db, analysis)
+        while True:
+            with track_queries(tally):
+                piece = next(reply, None)
+            if piece is None:
+                break
+            pieces.append(piece)
+            yield sse_event("chunk", {"text": piece})
+        with track_queries(tally):
+            message_id = save_chat_turn(db, user_message, "".join(pieces), received_at, conversation_id)
+        record_request("chatbot_stream", started, [analysis.intent])
+        yield sse_event("done", {"message_id": message_id})
     except Exception as ex:
-        raise HTTPException(status_code=500, detail=f"Error: {str(ex)}")
+        db.rollback()
+        metrics.inc("request_errors_total", reason="error")
+        yield sse_event("error", {"detail": f"Error: {str(ex)}"})
+    finally:
+        record_db_work(tally)
+        db.close()
 
-@app.get("/suggestions", response_model=SuggestionsResponse)
-async def suggestions(db: Session = Depends(get_db)):
+def load_suggestions(db: Session) -> SuggestionsResponse:
     # Get top suggestions by usage count
     db_suggestions = db.query(SuggestionDB).order_by(SuggestionDB.usage_count.desc()).limit(6).all()
 
     if not db_suggestions:
-        initialize_suggestions()
+        initialize_suggestions(db)
         db_suggestions = db.query(SuggestionDB).limit(6).all()
 
     return SuggestionsResponse(
         suggestions=[suggestion.content for suggestion in db_suggestions]
     )
 
-@app.get("/history", response_model=MessageHistoryResponse)
-async def message_history(limit: int = 50, db: Session = Depends(get_db)):
-    messages = db.query(MessageDB).order_by(MessageDB.timestamp.desc()).limit(limit).all()
+def encode_cursor(msg: MessageDB) -> str:
+    return base64.urlsafe_b64encode(f"{msg.timestamp.isoformat()}|{msg.id}".encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        timestamp, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.datetime.fromisoformat(timestamp), int(message_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid history cursor")
+
+def history_page(db: Session, limit: int, cursor: Optional[str] = None,
+                 conversation_id: Optional[str] = None) -> List[MessageDB]:
+    """One page of messages, newest first, strictly older than the cursor"""
+    query = db.query(MessageDB)
+    if conversation_id:
+        query = query.filter(MessageDB.conversation_id == conversation_id)
+    if cursor:
+        timestamp, message_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            MessageDB.timestamp < timestamp,
+            and_(MessageDB.timestamp == timestamp, MessageDB.id < message_id)
+        ))
+    return query.order_by(MessageDB.timestamp.desc(), MessageDB.id.desc()).limit(limit).all()
+
+def to_message(msg: MessageDB) -> Message:
+    return Message(
+        id=msg.id,
+        content=msg.content,
+        is_user=bool(msg.is_user),
+        timestamp=msg.timestamp
+    )
+
+def load_history(db: Session, limit: int, cursor: Optional[str] = None,
+                 conversation_id: Optional[str] = None) -> MessageHistoryResponse:
+    messages = history_page(db, limit, cursor, conversation_id)
 
     return MessageHistoryResponse(
-        messages=[Message(
-            id=msg.id,
-            content=msg.content,
-            is_user=bool(msg.is_user),
-            timestamp=msg.timestamp
-        ) for msg in messages]
+        messages=[to_message(msg) for msg in messages],
+        next_cursor=encode_cursor(messages[-1]) if messages and len(messages) == limit else None
     )
 
-@app.post("/add-suggestion")
-async def add_suggestion(data: MessageRequest, db: Session = Depends(get_db)):
-    new_suggestion = data.message.strip()
+def stream_history(conversation_id: Optional[str] = None, page_size: int = 1000):
+    """Yield the whole history as NDJSON, one keyset page at a time"""
+    cursor = None
+    while True:
+        db = SessionLocal()
+        try:
+            messages = history_page(db, page_size, cursor, conversation_id)
+        finally:
+            db.close()
+        for msg in messages:
+            yield to_message(msg).model_dump_json() + "\n"
+        if len(messages) < page_size:
+            return
+        cursor = encode_cursor(messages[-1])
+
+def save_suggestion(db: Session, new_suggestion: str) -> Dict[str, str]:
     existing = db.query(SuggestionDB).filter(SuggestionDB.content == new_suggestion).first()
     if existing:
         return {"status": "exists", "message": "Suggestion already exists"}
@@ -593,10 +1070,329 @@ async def add_suggestion(data: MessageRequest, db: Session = Depends(get_db)):
 
     return {"status": "success", "message": "Suggestion added successfully"}
 
+# Move conversations idle past the retention window to messages_archive
+ARCHIVE_COLUMNS = ["message_id", "content", "is_user", "timestamp", "conversation_id"]
+
+def archive_batch(db: Session, cutoff: datetime.datetime, batch_size: int) -> int:
+    """Archive up to batch_size idle conversations in one transaction; returns messages moved"""
+    stale_ids = [
+        row[0] for row in db.execute(
+            select(MessageDB.conversation_id)
+            .where(MessageDB.conversation_id.isnot(None))
+            .group_by(MessageDB.conversation_id)
+            .having(func.max(MessageDB.timestamp) < cutoff)
+            .limit(batch_size)
+        )
+    ]
+    # Messages from before conversations existed are archived by their own age, batch_size at a time
+    legacy_ids = [
+        row[0] for row in db.execute(
+            select(MessageDB.id)
+            .where(MessageDB.conversation_id.is_(None), MessageDB.timestamp < cutoff)
+            .order_by(MessageDB.id)
+            .limit(batch_size)
+        )
+    ]
+    if not stale_ids and not legacy_ids:
+        return 0
+    # The cutoff bounds both statements, so a message written to a stale conversation between
+    # the copy and the delete stays in messages instead of being deleted uncopied
+    condition = and_(
+        or_(MessageDB.conversation_id.in_(stale_ids), MessageDB.id.in_(legacy_ids)),
+        MessageDB.timestamp < cutoff
+    )
+
+    source = select(
+        MessageDB.id, MessageDB.content, MessageDB.is_user, MessageDB.timestamp, MessageDB.conversation_id
+    ).where(condition)
+    db.execute(insert(ArchivedMessageDB).from_select(ARCHIVE_COLUMNS, source))
+    moved = db.execute(delete(MessageDB).where(condition)).rowcount
+    db.commit()
+    return moved
+
+def archive_old_conversations() -> int:
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=MESSAGE_RETENTION_DAYS)
+    total = 0
+    while True:
+        db = SessionLocal()
+        try:
+            moved = archive_batch(db, cutoff, ARCHIVE_BATCH_SIZE)
+        finally:
+            db.close()
+        total += moved
+        if not moved:
+            return total
+
+archive_stop = threading.Event()
+
+def run_archive_job():
+    while True:
+        try:
+            archived = archive_old_conversations()
+            if archived:
+                print(f"Archived {archived} messages older than {MESSAGE_RETENTION_DAYS} days")
+        except Exception as ex:
+            print(f"Warning: message archiving failed: {ex}")
+        if archive_stop.wait(ARCHIVE_INTERVAL_HOURS * 3600):
+            return
+
+# Endpoints
+@app.post("/chatbot", response_model=ChatbotResponse)
+async def chatbot(data: MessageRequest):
+    started = time.perf_counter()
+    try:
+        user_message = data.message.strip()
+
+        if not user_message:
+            raise HTTPException(status_code=400, detail="No message provided")
+        
+        # Process the message with spaCy once, off the event loop, and share the result
+        analysis = await analyze_async(user_message)
+
+        conversation_id = data.conversation_id or uuid.uuid4().hex
+        response = await run_db(lambda db: process_chat_turn(db, user_message, analysis, conversation_id),
+                                cpu_bound=True)
+        record_request("chatbot", started, [analysis.intent])
+        return response
+    except NLPPoolBusy:
+        metrics.inc("request_errors_total", reason="busy")
+        raise HTTPException(status_code=503, detail="Chatbot is busy, please retry shortly")
+    except Exception as ex:
+        metrics.inc("request_errors_total", reason="error")
+        raise HTTPException(status_code=500, detail=f"Error: {str(ex)}")
+
+async def analyze_many(messages: List[str]) -> List[MessageAnalysis]:
+    """Analyze a batch together: spread over the NLP workers, or one nlp.pipe call on the NLP thread pool"""
+    if nlp_pool is not None:
+        futures = [nlp_pool.submit(message) for message in messages]
+        return list(await asyncio.gather(*(asyncio.wrap_future(future) for future in futures)))
+    return await run_nlp(analyze_batch, messages, None, False)
+
+@app.post("/chatbot/batch", response_model=BatchChatbotResponse)
+async def chatbot_batch(data: BatchMessageRequest):
+    messages = [message.strip() for message in data.messages]
+    if not messages or not all(messages):
+        raise HTTPException(status_code=400, detail="Every message must be non-empty")
+    if len(messages) > CHATBOT_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {CHATBOT_BATCH_MAX} messages per batch")
+    started = time.perf_counter()
+    try:
+        analyses = await analyze_many(messages)
+        conversation_id = data.conversation_id or uuid.uuid4().hex
+        response = await run_db(lambda db: process_chat_batch(db, messages, analyses, conversation_id),
+                                cpu_bound=True)
+        record_request("chatbot_batch", started, [analysis.intent for analysis in analyses])
+        return response
+    except NLPPoolBusy:
+        metrics.inc("request_errors_total", reason="busy")
+        raise HTTPException(status_code=503, detail="Chatbot is busy, please retry shortly")
+    except Exception as ex:
+        metrics.inc("request_errors_total", reason="error")
+        raise HTTPException(status_code=500, detail=f"Error: {str(ex)}")
+
+@app.post("/chatbot/stream")
+async def chatbot_stream(data: MessageRequest):
+    user_message = data.message.strip()
+    if not user_message:
+        raise HTTPException(status_code=400, detail="No message provided")
+    started = time.perf_counter()
+    try:
+        analysis = await analyze_async(user_message)
+    except NLPPoolBusy:
+        metrics.inc("request_errors_total", reason="busy")
+        raise HTTPException(status_code=503, detail="Chatbot is busy, please retry shortly")
+
+    conversation_id = data.conversation_id or uuid.uuid4().hex
+    # Sync generator, so Starlette iterates it (and runs its queries) in the thread pool
+    return StreamingResponse(
+        stream_chat_turn(user_message, analysis, conversation_id, started),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/suggestions", response_model=SuggestionsResponse)
+async def suggestions():
+    if suggestion_ranker.ready:
+        return SuggestionsResponse(suggestions=suggestion_ranker.top())
+    return await run_db(load_suggestions)
+
+@app.get("/history", response_model=MessageHistoryResponse)
+async def message_history(conversation_id: str = Query(..., min_length=1), limit: int = Query(50, ge=1, le=1000),
+                          cursor: Optional[str] = None):
+    return await run_db(lambda db: load_history(db, limit, cursor, conversation_id))
+
+@app.get("/history/export")
+async def export_history(conversation_id: str = Query(..., min_length=1)):
+    # Sync generator, so Starlette iterates it in the thread pool
+    return StreamingResponse(stream_history(conversation_id), media_type="application/x-ndjson")
+
+@app.post("/admin/archive")
+async def archive_now():
+    if MESSAGE_RETENTION_DAYS <= 0:
+        return {"status": "disabled", "archived_messages": 0}
+    return {"status": "success", "archived_messages": await run_in_threadpool(archive_old_conversations)}
+
+@app.post("/add-suggestion")
+async def add_suggestion(data: MessageRequest):
+    new_suggestion = data.message.strip()
+    result = await run_db(lambda db: save_suggestion(db, new_suggestion))
+    if result["status"] == "success":
+        suggestion_ranker.add(new_suggestion)
+    return result
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return response_cache.stats()
+
+@app.post("/cache/invalidate")
+async def cache_invalidate(data: CacheInvalidateRequest):
+    # Called by the admin backend after it writes to any of the cached tables
+    response_cache.invalidate(data.tables)
+    return {"status": "success", "invalidated": data.tables or "all"}
+
+def nlp_warm() -> bool:
+    if nlp_pool is not None:
+        return nlp_pool.stats()["ready"] > 0
+    return nlp_ready()
+
+@app.get("/ready")
+async def readiness():
+    checks = {"database": db_ready.is_set(), "nlp": nlp_warm(), "suggestions": suggestion_ranker.ready}
+    ready = all(checks.values())
+    return JSONResponse({"ready": ready, **checks}, status_code=200 if ready else 503)
+
+@app.get("/db-pool")
+async def db_pool_status():
+    stats = {"sync": pool_stats(engine.pool)}
+    if async_engine is not None:
+        stats["async"] = pool_stats(async_engine.pool)
+    return stats
+
+@app.get("/message-writer")
+async def message_writer_status():
+    if message_writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **message_writer.stats()}
+
+@app.get("/nlp-pool")
+async def nlp_pool_status():
+    if nlp_pool is None:
+        return {"enabled": False}
+    return {"enabled": True, **nlp_pool.stats()}
+
+class ProfilerToggle(BaseModel):
+    enabled: bool
+    interval_ms: Optional[int] = None
+    # Drop the samples collected so far
+    reset: bool = False
+
+def pool_gauge(pool) -> Dict[tuple, float]:
+    stats = pool_stats(pool)
+    return {(("state", name),): stats[name] for name in ("checkedin", "checkedout", "overflow") if name in stats}
+
+metrics.add_histograms("intent_handler_seconds", "handler", intent_router.histograms)
+metrics.add_gauge("db_pool_connections", lambda: pool_gauge(engine.pool))
+metrics.add_gauge("response_cache_lookups", lambda: {
+    (("result", "hit"),): response_cache.hits, (("result", "miss"),): response_cache.misses
+})
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/profiler")
+async def profiler_status(top: int = 20):
+    return profiler.stats(top)
+
+@app.post("/profiler")
+async def profiler_toggle(data: ProfilerToggle):
+    if data.reset:
+        profiler.reset()
+    if data.enabled:
+        profiler.start(data.interval_ms)
+    else:
+        await run_in_threadpool(profiler.stop)
+    return profiler.stats(0)
+
+@app.get("/intents/stats")
+async def intent_stats():
+    return {"handlers": intent_router.intents(), "latency": intent_router.stats()}
+
+@app.get("/nlp-tiers")
+async def nlp_tier_status():
+    return {"profile": NLP_PROFILE, "tiers": tier_stats.stats()}
+
+@app.get("/fragments")
+async def fragment_store_status():
+    return {"enabled": fragment_store.enabled, **fragment_store.stats()}
+
+@app.get("/change-feed")
+async def change_feed_status():
+    return change_feed.stats()
+
+@app.get("/catalog")
+async def catalog_status():
+    return {"enabled": CATALOG_SNAPSHOT_ENABLED, **catalog.stats()}
+
+@app.get("/nlp-batcher")
+async def nlp_batcher_status():
+    if nlp_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **nlp_batcher.stats()}
+
 # Initialize app with default data
 @app.on_event("startup")
 async def startup_event():
-    initialize_suggestions()
+    # The spaCy model loads in the background unless eager loading is configured;
+    # /ready reports when it is warm
+    if NLP_EAGER_LOAD:
+        await run_in_threadpool(warm_up)
+    elif nlp_pool is None:
+        warm_up_in_background()
+
+    await run_in_threadpool(init_db)
+
+    # Pay the connect latency now rather than on the first requests
+    try:
+        await run_in_threadpool(warm_pool)
+        if async_engine is not None:
+            await warm_async_pool()
+    except Exception as ex:
+        print(f"Warning: could not pre-open database connections: {ex}")
+
+    if nlp_pool is not None:
+        nlp_pool.start()
+    if nlp_batcher is not None:
+        nlp_batcher.start()
+    stats_provider.start()
+    change_feed.start()
+    if message_writer is not None:
+        message_writer.start()
+    await run_db(initialize_suggestions)
+    await run_db(suggestion_ranker.load)
+    suggestion_ranker.start()
+    if MESSAGE_RETENTION_DAYS > 0:
+        threading.Thread(target=run_archive_job, name="message-archive", daemon=True).start()
+    if PROFILER_ENABLED:
+        profiler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if nlp_batcher is not None:
+        await nlp_batcher.stop()
+    archive_stop.set()
+    stats_provider.stop()
+    await run_in_threadpool(change_feed.stop)
+    if message_writer is not None:
+        # Flush buffered messages before the process exits
+        await run_in_threadpool(message_writer.close)
+    await run_in_threadpool(suggestion_ranker.close)
+    profiler.stop()
+    nlp_executor.shutdown(wait=False)
+    if nlp_pool is not None:
+        nlp_pool.close()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 # Start the server
 if __name__ == "__main__":
@@ -0,0 +1,668 @@
+# benchmark.py
+# Local benchmarks for the chatbot pipeline. Runs against a SQLite stand-in so no SQL Server is needed.
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.db")
+
+import app  # noqa: E402
+from entity_rules import entity_extractor  # noqa: E402
+from intents import INTENT_PATTERNS, FALLBACK_INTENT_PATTERNS  # noqa: E402
+
+SAMPLE_MESSAGES = [
+    "List all products",
+    "Show product categories",
+    "Show brands",
+    "List all users",
+    "How many products in stock?",
+    "How many suppliers?",
+    "Show out of stock products",
+    "Show user permissions",
+    "Give email id of supplier Avantika Patil",
+    "What's the price of Laptop XPS 15?",
+    "Get phone number of supplier Tech Solutions",
+    "I am looking for wireless headphones",
+]
+
+ENTITY_QUERIES = SAMPLE_MESSAGES + [
+    "find gaming mouse",
+    "search for usb c cable",
+    "How much does the Dell Monitor cost?",
+    "How much is Office Chair",
+    "price of Samsung Galaxy S23",
+    "What is the price of iPhone 15?",
+    "Email address of supplier Global Traders",
+    "phone for vendor Acme Corp",
+    "contact number of Sharma Electronics",
+    "Address of supplier Metro Wholesale",
+    "Show me 5 products",
+    "List 20 users",
+    "Is the Laptop XPS 15 in stock?",
+    "Which items are available in inventory?",
+    "supplier Tech Solutions email",
+]
+
+def cpu_per_message(fn, messages, rounds: int) -> float:
+    """Average CPU milliseconds spent by fn per message"""
+    start = time.process_time()
+    for _ in range(rounds):
+        for message in messages:
+            fn(message)
+    return (time.process_time() - start) * 1000 / (rounds * len(messages))
+
+def legacy_nlp_stage(message: str):
+    # What the endpoint did before: one parse for doc.ents, another inside extract_entities
+    doc = app.get_nlp()(message)
+    [{"label": ent.label_, "text": ent.text} for ent in doc.ents]
+    app.extract_entities(message)
+    app.classify_intent(message)
+
+def bench_nlp(args):
+    legacy = cpu_per_message(legacy_nlp_stage, SAMPLE_MESSAGES, args.rounds)
+    single = cpu_per_message(app.analyze_message, SAMPLE_MESSAGES, args.rounds)
+    print(f"two-pass NLP stage:    {legacy:.3f} ms CPU/message")
+    print(f"single-pass NLP stage: {single:.3f} ms CPU/message")
+    print(f"saved: {legacy - single:.3f} ms CPU/message ({(1 - single / legacy) * 100:.1f}%)")
+
+def legacy_classify_intent(message: str) -> str:
+    # The original nested loop over raw pattern strings
+    message_lower = message.lower()
+    for intent, patterns in INTENT_PATTERNS.items():
+        for pattern in patterns:
+            if re.search(pattern, message_lower, re.IGNORECASE):
+                return intent
+    for intent, pattern in FALLBACK_INTENT_PATTERNS:
+        if re.search(pattern, message_lower):
+            return intent
+    return "unknown"
+
+def intent_corpus():
+    # Suggestions plus one literal phrase per pattern, with and without surrounding noise
+    corpus = list(SAMPLE_MESSAGES)
+    for intent, patterns in INTENT_PATTERNS.items():
+        for pattern in patterns:
+            phrase = re.sub(r"\\s[+*]?", " ", pattern)
+            phrase = re.sub(r"\(\?:([^|)]*)[^)]*\)\??|\\b|[?]", r"\1", phrase)
+            corpus.extend([phrase, f"please {phrase} today", f"{phrase} of supplier Avantika Patil"])
+    return corpus
+
+def bench_intents(args):
+    corpus = intent_corpus()
+    mismatches = [m for m in corpus if legacy_classify_intent(m) != app.classify_intent(m)]
+    for message in mismatches:
+        print(f"MISMATCH: {message!r}: {legacy_classify_intent(message)} != {app.classify_intent(message)}")
+    print(f"parity: {len(corpus) - len(mismatches)}/{len(corpus)} messages classified identically")
+
+    legacy = cpu_per_message(legacy_classify_intent, corpus, args.rounds)
+    compiled = cpu_per_message(app.classify_intent, corpus, args.rounds)
+    print(f"legacy classify_intent:   {legacy * 1000:.1f} us/message")
+    print(f"compiled classify_intent: {compiled * 1000:.1f} us/message")
+    if mismatches:
+        raise SystemExit(1)
+
+def legacy_extract_slots(message: str):
+    # The regex stage of extract_entities before the rule table, patterns rebuilt on every call
+    entities = {}
+
+    # Extract product names, categories, numbers, etc.
+    # Look for product names after terms like "find" or "search"
+    product_search_patterns = [r"find\s+([\w\s]+)", r"search\s+for\s+([\w\s]+)", r"looking\s+for\s+([\w\s]+)"]
+    for pattern in product_search_patterns:
+        match = re.search(pattern, message, re.IGNORECASE)
+        if match:
+            entities["product_name"] = match.group(1).strip()
+            break
+
+    # Extract supplier name pattern
+    supplier_patterns = [
+        r"(?:supplier|vendor)\s+([A-Za-z\s]+?)(?:\s+(?:email|phone|contact|address)|$)",
+        r"(?:email|phone|contact|address)\s+(?:of|for)\s+(?:supplier|vendor)\s+([A-Za-z\s]+)(?:\?|$)",
+        r"(?:email|phone|contact|address)\s+(?:of|for)\s+([A-Za-z\s]+)(?:\?|$)"
+    ]
+
+    for pattern in supplier_patterns:
+        match = re.search(pattern, message, re.IGNORECASE)
+        if match:
+            entities["supplier_name"] = match.group(1).strip()
+            break
+
+    # Extract product price pattern
+    price_patterns = [
+        r"price\s+of\s+([\w\s\d]+?)(?:\?|$)",
+        r"how\s+much\s+(?:is|does|costs?)\s+([\w\s\d]+?)(?:\?|$)",
+        r"what(?:'s|\s+is)\s+the\s+price\s+of\s+([\w\s\d]+?)(?:\?|$)"
+    ]
+
+    for pattern in price_patterns:
+        match = re.search(pattern, message, re.IGNORECASE)
+        if match:
+            entities["product_name"] = match.group(1).strip()
+            break
+
+    # Extract what attribute/field they're looking for
+    field_patterns = {
+        "email": [r"email\s+(?:id|address)", r"e-?mail"],
+        "phone": [r"phone\s+(?:number|no\.?)", r"contact\s+number"],
+        "address": [r"address", r"location"],
+        "price": [r"price", r"cost", r"how much"],
+        "stock": [r"stock", r"inventory", r"available"]
+    }
+
+    for field, patterns in field_patterns.items():
+        for pattern in patterns:
+            if re.search(pattern, message, re.IGNORECASE):
+                entities["requested_field"] = field
+                break
+        if "requested_field" in entities:
+            break
+
+    # Extract numbers for potential quantities or IDs
+    quantity_pattern = r"(\d+)\s+(?:products?|items?|users?)"
+    match = re.search(quantity_pattern, message, re.IGNORECASE)
+    if match:
+        entities["quantity"] = int(match.group(1))
+
+    return entities
+
+def bench_entities(args):
+    mismatches = [m for m in ENTITY_QUERIES if legacy_extract_slots(m) != entity_extractor.extract(m)]
+    for message in mismatches:
+        print(f"MISMATCH: {message!r}: {legacy_extract_slots(message)} != {entity_extractor.extract(message)}")
+    print(f"parity: {len(ENTITY_QUERIES) - len(mismatches)}/{len(ENTITY_QUERIES)} queries extracted identically")
+
+    legacy = cpu_per_message(legacy_extract_slots, ENTITY_QUERIES, args.rounds)
+    compiled = cpu_per_message(entity_extractor.extract, ENTITY_QUERIES, args.rounds)
+    print(f"legacy slot extraction:   {legacy * 1000:.1f} us/message")
+    print(f"rule table extraction:    {compiled * 1000:.1f} us/message")
+    if mismatches:
+        raise SystemExit(1)
+
+PRODUCT_WORDS = ["Wireless", "Gaming", "Portable", "Smart", "Ergonomic", "Compact", "Premium", "Classic"]
+PRODUCT_NOUNS = ["Headphones", "Mouse", "Keyboard", "Monitor", "Laptop", "Office Chair", "Speaker", "Webcam",
+                 "Router", "Tablet", "Printer", "USB C Cable"]
+SUPPLIER_SURNAMES = ["Patil", "Sharma", "Acme", "Global", "Metro", "Sunrise", "Kumar", "Evergreen"]
+SUPPLIER_KINDS = ["Traders", "Electronics", "Wholesale", "Solutions", "Supplies", "Corp"]
+MODULES = ["Products", "Orders", "Users", "Suppliers", "Reports"]
+
+def product_name(i: int) -> str:
+    # Index 0 is the product the default suggestions ask about
+    if i == 0:
+        return "Laptop XPS 15"
+    return f"{PRODUCT_WORDS[i % len(PRODUCT_WORDS)]} {PRODUCT_NOUNS[i // len(PRODUCT_WORDS) % len(PRODUCT_NOUNS)]} {i}"
+
+def supplier_name(i: int) -> str:
+    if i < 2:
+        return ["Avantika Patil", "Tech Solutions"][i]
+    return f"{SUPPLIER_SURNAMES[i % len(SUPPLIER_SURNAMES)]} {SUPPLIER_KINDS[i // len(SUPPLIER_SURNAMES) % len(SUPPLIER_KINDS)]} {i}"
+
+def insert_chunked(db, model, rows, chunk_size: int = 20000):
+    from sqlalchemy import insert
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            db.execute(insert(model), chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert(model), chunk)
+
+def seed_database(products: int, suppliers: int, users: int = 100):
+    """Recreate the SQLite stand-in with a deterministic synthetic catalog.
+
+    Every table is dropped first, so a run never reuses another run's catalog (seeded with
+    different sizes) or the messages and suggestion counts earlier runs left behind.
+    """
+    if app.engine.dialect.name != "sqlite":
+        # Never drop tables in a real database
+        raise SystemExit("benchmarks recreate their database; set DATABASE_URL to a SQLite file")
+    app.Base.metadata.drop_all(bind=app.engine)
+    app.db_ready.clear()
+    app.init_db()
+    db = app.SessionLocal()
+    try:
+        insert_chunked(db, app.Category, (
+            {"CategoryName": f"Category {i}", "Description": f"Products of category {i}"} for i in range(20)
+        ))
+        insert_chunked(db, app.Brand, (
+            {"BrandName": f"Brand {i}", "Description": f"Products made by brand {i}"} for i in range(15)
+        ))
+        insert_chunked(db, app.Product, (
+            {"Name": product_name(i), "Price": f"{10 + i % 990}.99", "Category": f"Category {i % 20}",
+             "Stock": i % 7, "CategoryId": i % 20}
+            for i in range(products)
+        ))
+        insert_chunked(db, app.Supplier, (
+            {"Name": supplier_name(i), "Email": f"supplier{i}@example.com", "Phone": f"555-{i:04d}",
+             "Address": f"{i} Market Street"}
+            for i in range(suppliers)
+        ))
+        insert_chunked(db, app.User, (
+            {"Username": f"user{i}", "Email": f"user{i}@example.com", "FirstName": f"First{i}",
+             "LastName": f"Last{i}", "PasswordHash": "x" * 60, "IsActive": 1}
+            for i in range(users)
+        ))
+        insert_chunked(db, app.UserPermission, (
+            {"UserId": i, "ModuleName": module, "CanCreate": i % 2, "CanRead": 1, "CanUpdate": int(i % 3 == 0),
+             "CanDelete": int(i % 5 == 0)}
+            for i in range(users) for module in MODULES
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+async def requests_per_second(client, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(i: int):
+        async with semaphore:
+            response = await client.post("/chatbot", json={"message": SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)]})
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(i) for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+async def run_load(args):
+    import httpx
+
+    # ASGITransport does not run lifespan events, so start the app's pools by hand
+    await app.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for concurrency in args.concurrency:
+                rps = await requests_per_second(client, args.requests, concurrency)
+                print(f"  concurrency {concurrency:>3}: {rps:8.1f} req/s")
+    finally:
+        await app.app.router.shutdown()
+
+def bench_load(args):
+    seed_database(args.products, args.suppliers)
+    # Chat turns run in the thread pool either way; ASYNC_DB only moves the light reads
+    mode = "thread pool, async engine for reads" if app.AsyncSessionLocal is not None else "thread pool"
+    if app.nlp_pool is not None:
+        nlp_mode = f"{app.nlp_pool.size} NLP workers"
+    elif app.nlp_batcher is not None:
+        nlp_mode = "micro-batched NLP"
+    else:
+        nlp_mode = "threaded NLP"
+    print(f"/chatbot load test ({mode}, {nlp_mode}, {args.requests} requests per level)")
+    asyncio.run(run_load(args))
+    if app.nlp_batcher is not None:
+        print(f"  batch sizes: {app.nlp_batcher.stats()['batch_size_histogram']}")
+
+def bench_pool(args):
+    from sqlalchemy import create_engine, text
+
+    def first_query_ms(engine) -> float:
+        start = time.perf_counter()
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return (time.perf_counter() - start) * 1000
+
+    url = app.SQLALCHEMY_DATABASE_URL
+    cold, warm = [], []
+    for _ in range(args.rounds):
+        engine = create_engine(url, connect_args=app.connect_args, **app.engine_options(url))
+        cold.append(first_query_ms(engine))
+        engine.dispose()
+
+        engine = create_engine(url, connect_args=app.connect_args, **app.engine_options(url))
+        # Same as warm_pool at startup
+        [connection.close() for connection in [engine.connect() for _ in range(args.warm)]]
+        warm.append(first_query_ms(engine))
+        engine.dispose()
+
+    print(f"first query on a cold pool: {sorted(cold)[len(cold) // 2]:.3f} ms (median of {args.rounds})")
+    print(f"first query on a warm pool: {sorted(warm)[len(warm) // 2]:.3f} ms (median of {args.rounds})")
+
+# Questions that name a seeded product or supplier
+NAME_TEMPLATES = [
+    ("What's the price of {name}?", product_name),
+    ("find {name}", product_name),
+    ("Is the {name} in stock?", product_name),
+    ("Give email id of supplier {name}", supplier_name),
+    ("Get phone number of supplier {name}", supplier_name),
+    ("Address of supplier {name}", supplier_name),
+]
+
+def replay_corpus(products: int, suppliers: int, count: int, seed: int) -> list:
+    """Deterministic mix of intent phrases, default suggestions and questions about seeded rows"""
+    rng = random.Random(seed)
+    phrases = intent_corpus() + app.DEFAULT_SUGGESTIONS
+    corpus = []
+    for _ in range(count):
+        if rng.random() < 0.6:
+            corpus.append(rng.choice(phrases))
+            continue
+        template, name = rng.choice(NAME_TEMPLATES)
+        size = products if name is product_name else suppliers
+        corpus.append(template.format(name=name(rng.randrange(size))))
+    return corpus
+
+def latency_summary(latencies: list) -> dict:
+    ordered = sorted(latencies)
+    total = sum(ordered)
+
+    def percentile(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "p50_ms": round(percentile(0.50), 4),
+        "p99_ms": round(percentile(0.99), 4),
+        "mean_ms": round(total / len(ordered) * 1000, 4),
+        "throughput_per_s": round(len(ordered) / total, 1) if total else 0.0,
+    }
+
+def time_each(fn, items) -> list:
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+async def run_suite_stages(messages: list) -> dict:
+    import httpx
+
+    await app.app.router.startup()
+    try:
+        # Measure a warm process: model loaded and fuzzy name index built
+        while not app.nlp_warm() or (app.SEARCH_INDEX_ENABLED and not app.product_index.ready):
+            await asyncio.sleep(0.05)
+
+        stages = {
+            "classification": latency_summary(time_each(app.classify_intent, messages)),
+            "extraction": latency_summary(time_each(app.extract_entities, messages)),
+        }
+
+        # Query stage: reply generation against the database, with the response cache out of the way
+        analyses = [app.analyze_message(message) for message in messages]
+        cache_size, app.response_cache.max_entries = app.response_cache.max_entries, 0
+        db = app.SessionLocal()
+        try:
+            stages["query"] = latency_summary(time_each(
+                lambda pair: app.generate_response(pair[0], db, pair[1]),
+                list(zip(messages, analyses))
+            ))
+        finally:
+            db.close()
+            app.response_cache.max_entries = cache_size
+
+        latencies = []
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for message in messages:
+                start = time.perf_counter()
+                response = await client.post("/chatbot", json={"message": message, "conversation_id": "benchmark"})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+        stages["end_to_end"] = latency_summary(latencies)
+        return stages
+    finally:
+        await app.app.router.shutdown()
+
+def bench_suite_size(args):
+    """One catalog size in this process; prints its results as a JSON line"""
+    start = time.perf_counter()
+    seed_database(args.products, args.suppliers, args.users)
+    seed_seconds = time.perf_counter() - start
+    messages = replay_corpus(args.products, args.suppliers, args.messages, args.seed)
+    stages = asyncio.run(run_suite_stages(messages))
+    print(json.dumps({
+        "products": args.products,
+        "suppliers": args.suppliers,
+        "users": args.users,
+        "seed_seconds": round(seed_seconds, 2),
+        "stages": stages,
+    }))
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def bench_suite(args):
+    """Every catalog size in its own process and SQLite file, so sizes never share caches or rows"""
+    runs = []
+    for size in args.sizes:
+        suppliers = max(int(size * args.supplier_ratio), 2)
+        print(f"catalog of {size} products / {suppliers} suppliers...", file=sys.stderr)
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "suite-size", "--products", str(size),
+             "--suppliers", str(suppliers), "--users", str(args.users), "--messages", str(args.messages),
+             "--seed", str(args.seed)],
+            stdout=subprocess.PIPE, text=True, check=True,
+            env={**os.environ, "DATABASE_URL": f"sqlite:///benchmark-{size}.db"},
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        runs.append(json.loads(output.stdout.splitlines()[-1]))
+
+    print(f"{'products':>9} {'stage':<15} {'p50 ms':>10} {'p99 ms':>10} {'msg/s':>10}")
+    for run in runs:
+        for stage, summary in run["stages"].items():
+            print(f"{run['products']:>9} {stage:<15} {summary['p50_ms']:>10.3f} {summary['p99_ms']:>10.3f} "
+                  f"{summary['throughput_per_s']:>10.1f}")
+
+    if args.json:
+        report = {
+            "commit": current_commit(),
+            "created_at": datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "messages": args.messages,
+            "seed": args.seed,
+            "config": {
+                "NLP_PROFILE": app.NLP_PROFILE,
+                "NLP_WORKERS": app.NLP_WORKERS,
+                "NLP_MICRO_BATCHING": app.NLP_MICRO_BATCHING,
+                "ASYNC_DB": app.ASYNC_DB,
+                "RESPONSE_CACHE_SIZE": app.RESPONSE_CACHE_SIZE,
+                "SEARCH_INDEX_ENABLED": app.SEARCH_INDEX_ENABLED,
+                "MESSAGE_WRITE_BEHIND": app.MESSAGE_WRITE_BEHIND,
+            },
+            "runs": runs,
+        }
+        with open(args.json, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+        print(f"wrote {args.json}")
+
+STARTUP_PROBE = """
+import asyncio, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+asyncio.run(app.app.router.startup())
+started = time.perf_counter()
+while not app.nlp_warm():
+    time.sleep(0.01)
+ready = time.perf_counter()
+asyncio.run(app.app.router.shutdown())
+print(imported - start, started - start, ready - start)
+"""
+
+def bench_startup(args):
+    """Time a fresh interpreter from import to accepting requests and to a warm NLP model"""
+    timings = []
+    for _ in range(args.rounds):
+        output = subprocess.run([sys.executable, "-c", STARTUP_PROBE], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        timings.append([float(value) for value in output.stdout.split()[-3:]])
+    for position, label in enumerate(["import app", "startup handlers", "NLP ready"]):
+        values = sorted(timing[position] for timing in timings)
+        print(f"{label + ':':<18} {values[len(values) // 2] * 1000:8.1f} ms (median of {args.rounds})")
+
+TIER_PROBE = """
+import json, sys, time
+import nlp_pipeline
+messages, rounds = json.loads(sys.argv[1]), int(sys.argv[2])
+nlp_pipeline.warm_up()
+latencies, results = {}, []
+for _ in range(rounds):
+    for message in messages:
+        start = time.perf_counter()
+        analysis = nlp_pipeline.analyze_message(message)
+        tier = "spacy" if analysis.doc is not None else "regex"
+        latencies.setdefault(tier, []).append(time.perf_counter() - start)
+for message in messages:
+    analysis = nlp_pipeline.analyze_message(message)
+    results.append([analysis.intent, analysis.entities])
+print(json.dumps({"latencies": latencies, "results": results}))
+"""
+
+def bench_tiers(args):
+    """Per-message latency of each pipeline profile, and whether its replies match the full pipeline"""
+    messages = ENTITY_QUERIES
+    runs = {}
+    for profile in ("full", "trimmed", "regex"):
+        output = subprocess.run([sys.executable, "-c", TIER_PROBE, json.dumps(messages), str(args.rounds)],
+                                capture_output=True, text=True, check=True,
+                                env={**os.environ, "NLP_PROFILE": profile},
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        runs[profile] = json.loads(output.stdout.splitlines()[-1])
+
+    for profile, run in runs.items():
+        for tier, values in sorted(run["latencies"].items()):
+            values.sort()
+            share = len(values) / (len(messages) * args.rounds) * 100
+            print(f"{profile:<8} {tier:<6} {share:5.1f}% of messages  "
+                  f"p50 {values[len(values) // 2] * 1000:8.3f} ms  p99 {values[int(len(values) * 0.99)] * 1000:8.3f} ms")
+
+    mismatches = 0
+    for profile in ("trimmed", "regex"):
+        for message, expected, actual in zip(messages, runs["full"]["results"], runs[profile]["results"]):
+            if expected != actual:
+                mismatches += 1
+                print(f"MISMATCH ({profile}) {message!r}: full={expected} {profile}={actual}")
+    print(f"intent/slot parity with the full pipeline: {'ok' if not mismatches else f'{mismatches} mismatches'}")
+    if mismatches:
+        raise SystemExit(1)
+
+FRAGMENT_PROBE = """
+import json, sys, time
+import app
+intents, rounds = json.loads(sys.argv[1]), int(sys.argv[2])
+db = app.SessionLocal()
+latencies, replies, warm_hits = {}, {}, {}
+for intent in intents:
+    handler = app.intent_router._handlers[intent]
+    values = latencies.setdefault(intent, [])
+    for _ in range(rounds):
+        start = time.perf_counter()
+        "".join(handler.respond("", db, None))
+        values.append(time.perf_counter() - start)
+    # Compared after the timing loop, so with the store on it is built from stored fragments
+    hits = app.fragment_store.hits
+    replies[intent] = "".join(handler.respond("", db, None))
+    warm_hits[intent] = app.fragment_store.hits - hits
+db.close()
+print(json.dumps({"latencies": latencies, "replies": replies, "warm_hits": warm_hits}))
+"""
+
+LISTING_INTENTS = ["list_products", "brands", "list_users", "user_permissions", "suppliers"]
+
+def bench_fragments(args):
+    """Listing reply time with every row formatted versus lines from the fragment store, same replies"""
+    seed_database(args.products, args.suppliers, args.users)
+    runs = {}
+    for label, size in (("formatted", "0"), ("fragments", str(app.LIST_FRAGMENT_CACHE_SIZE or 10000))):
+        output = subprocess.run([sys.executable, "-c", FRAGMENT_PROBE, json.dumps(LISTING_INTENTS), str(args.rounds)],
+                                capture_output=True, text=True, check=True,
+                                env={**os.environ, "LIST_FRAGMENT_CACHE_SIZE": size, "RESPONSE_CACHE_SIZE": "0",
+                                     "LIST_RESULT_LIMIT": str(args.limit)},
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        runs[label] = json.loads(output.stdout.splitlines()[-1])
+
+    print(f"{'intent':<18} {'formatted ms':>13} {'fragments ms':>13}")
+    for intent in LISTING_INTENTS:
+        medians = [sorted(runs[label]["latencies"][intent])[args.rounds // 2] * 1000 for label in runs]
+        print(f"{intent:<18} {medians[0]:>13.3f} {medians[1]:>13.3f}")
+
+    mismatches = [intent for intent in LISTING_INTENTS
+                  if runs["formatted"]["replies"][intent] != runs["fragments"]["replies"][intent]]
+    # A reply with no fragment hits would only compare formatted output with formatted output
+    cold = [intent for intent in LISTING_INTENTS if not runs["fragments"]["warm_hits"][intent]]
+    print(f"reply parity: {'ok' if not mismatches else 'mismatch in ' + ', '.join(mismatches)}")
+    if cold:
+        print(f"no fragment hits for: {', '.join(cold)}")
+    if mismatches or cold:
+        raise SystemExit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Chatbot pipeline benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    nlp_parser = subparsers.add_parser("nlp", help="CPU per message for the NLP stage")
+    nlp_parser.add_argument("--rounds", type=int, default=50)
+    nlp_parser.set_defaults(func=bench_nlp)
+
+    intents_parser = subparsers.add_parser("intents", help="Parity and speed of the compiled intent classifier")
+    intents_parser.add_argument("--rounds", type=int, default=200)
+    intents_parser.set_defaults(func=bench_intents)
+
+    entities_parser = subparsers.add_parser("entities", help="Parity and speed of the entity rule table")
+    entities_parser.add_argument("--rounds", type=int, default=200)
+    entities_parser.set_defaults(func=bench_entities)
+
+    load_parser = subparsers.add_parser("load", help="Requests/sec through /chatbot at increasing concurrency")
+    load_parser.add_argument("--requests", type=int, default=200)
+    load_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    load_parser.add_argument("--products", type=int, default=1000)
+    load_parser.add_argument("--suppliers", type=int, default=100)
+    load_parser.set_defaults(func=bench_load)
+
+    pool_parser = subparsers.add_parser("pool", help="First-query latency on a cold versus pre-warmed pool")
+    pool_parser.add_argument("--rounds", type=int, default=20)
+    pool_parser.add_argument("--warm", type=int, default=app.DB_POOL_WARM)
+    pool_parser.set_defaults(func=bench_pool)
+
+    tiers_parser = subparsers.add_parser("tiers", help="Latency per message of each NLP pipeline profile")
+    tiers_parser.add_argument("--rounds", type=int, default=50)
+    tiers_parser.set_defaults(func=bench_tiers)
+
+    suite_parser = subparsers.add_parser("suite", help="p50/p99 and throughput per stage across catalog sizes")
+    suite_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    suite_parser.add_argument("--supplier-ratio", type=float, default=0.1, help="Suppliers per product")
+    suite_parser.add_argument("--users", type=int, default=100)
+    suite_parser.add_argument("--messages", type=int, default=500)
+    suite_parser.add_argument("--seed", type=int, default=42)
+    suite_parser.add_argument("--json", help="Write the results to this file for comparison across commits")
+    suite_parser.set_defaults(func=bench_suite)
+
+    suite_size_parser = subparsers.add_parser("suite-size", help="One catalog size of the suite (run by 'suite')")
+    suite_size_parser.add_argument("--products", type=int, required=True)
+    suite_size_parser.add_argument("--suppliers", type=int, required=True)
+    suite_size_parser.add_argument("--users", type=int, default=100)
+    suite_size_parser.add_argument("--messages", type=int, default=500)
+    suite_size_parser.add_argument("--seed", type=int, default=42)
+    suite_size_parser.set_defaults(func=bench_suite_size)
+
+    startup_parser = subparsers.add_parser("startup", help="Time from process start to serving and to a warm model")
+    startup_parser.add_argument("--rounds", type=int, default=5)
+    startup_parser.set_defaults(func=bench_startup)
+
+    fragments_parser = subparsers.add_parser("fragments", help="Listing replies with and without the fragment store")
+    fragments_parser.add_argument("--products", type=int, default=2000)
+    fragments_parser.add_argument("--suppliers", type=int, default=1000)
+    fragments_parser.add_argument("--users", type=int, default=200)
+    fragments_parser.add_argument("--limit", type=int, default=1000, help="LIST_RESULT_LIMIT for the run")
+    fragments_parser.add_argument("--rounds", type=int, default=30)
+    fragments_parser.set_defaults(func=bench_fragments)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# catalog_snapshot.py
+# Immutable, column-oriented in-memory copies of catalog tables, kept current from the change feed.
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from change_feed import ChangeFeed, TableChanges
+from search_index import normalize
+
+def column_array(values: List[Any]):
+    """Integer columns as a compact array('q'); anything else (strings, NULLs) as a list"""
+    try:
+        return array("q", values)
+    except (TypeError, OverflowError):
+        return values
+
+class Record:
+    """Read-only view of one snapshot row; attributes are read from the snapshot's columns"""
+    __slots__ = ("_snapshot", "_position")
+
+    def __init__(self, snapshot: "TableSnapshot", position: int):
+        self._snapshot = snapshot
+        self._position = position
+
+    def __getattr__(self, name: str):
+        try:
+            return self._snapshot.columns[name][self._position]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __repr__(self):
+        return f"Record({self._snapshot.key}={getattr(self, self._snapshot.key)!r})"
+
+class TableSnapshot:
+    """One table as parallel columns plus lookups by primary key and by normalized name.
+
+    Snapshots are never modified: with_changes() builds a new one, so readers holding the
+    previous snapshot keep a consistent view while the refresher swaps in the next.
+    """
+    __slots__ = ("key", "name_column", "columns", "watermark", "_positions", "_names")
+
+    def __init__(self, key: str, name_column: str, columns: Dict[str, Sequence], watermark=None):
+        self.key = key
+        self.name_column = name_column
+        self.columns = columns
+        self.watermark = watermark
+        self._positions = {value: position for position, value in enumerate(columns[key])}
+        self._names: Dict[str, int] = {}
+        for position, name in enumerate(columns[name_column]):
+            self._names.setdefault(normalize(name), position)
+
+    @classmethod
+    def from_rows(cls, key: str, name_column: str, column_names: Sequence[str], rows: Iterable[Sequence],
+                  watermark=None) -> "TableSnapshot":
+        values: List[List[Any]] = [[] for _ in column_names]
+        for row in rows:
+            for column, value in zip(values, row):
+                column.append(value)
+        return cls(key, name_column, {name: column_array(column) for name, column in zip(column_names, values)}, watermark)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def get(self, key) -> Optional[Record]:
+        position = self._positions.get(key)
+        return Record(self, position) if position is not None else None
+
+    def find(self, name: str) -> Optional[Record]:
+        """Row whose name matches exactly, ignoring case and repeated whitespace"""
+        position = self._names.get(normalize(name))
+        return Record(self, position) if position is not None else None
+
+    def with_changes(self, rows: Sequence[Sequence], watermark) -> "TableSnapshot":
+        """Copy of this snapshot with the given rows (in column order) inserted or replaced"""
+        column_names = list(self.columns)
+        values = {name: list(column) for name, column in self.columns.items()}
+        key_index = column_names.index(self.key)
+        positions = dict(self._positions)
+        for row in rows:
+            position = positions.get(row[key_index])
+            if position is None:
+                positions[row[key_index]] = len(values[self.key])
+                for name, value in zip(column_names, row):
+                    values[name].append(value)
+            else:
+                for name, value in zip(column_names, row):
+                    values[name][position] = value
+        return TableSnapshot(self.key, self.name_column,
+                             {name: column_array(column) for name, column in values.items()}, watermark)
+
+@dataclass(frozen=True)
+class SnapshotSpec:
+    key: str
+    name_column: str
+    columns: Tuple[str, ...]
+
+class CatalogSnapshots:
+    """Table snapshots built from change feed deltas.
+
+    A full reload from the feed builds a fresh snapshot; a delta builds a copy with the
+    changed rows. Either way the new snapshot replaces the old one with a single reference
+    assignment, so readers see the old or the new snapshot, never a mix.
+    """
+
+    def __init__(self, specs: Dict[str, SnapshotSpec]):
+        self.specs = specs
+        self._snapshots: Dict[str, TableSnapshot] = {}
+        self.full_loads = 0
+        self.delta_rows = 0
+
+    def get(self, name: str) -> Optional[TableSnapshot]:
+        return self._snapshots.get(name)
+
+    def subscribe(self, feed: ChangeFeed):
+        for table in self.specs:
+            feed.subscribe(table, self.apply)
+
+    def apply(self, changes: TableChanges):
+        spec = self.specs[changes.table]
+        rows = [tuple(getattr(row, column) for column in spec.columns) for row in changes.rows]
+        if changes.full:
+            self._snapshots[changes.table] = TableSnapshot.from_rows(
+                spec.key, spec.name_column, spec.columns, rows, changes.watermark
+            )
+            self.full_loads += 1
+        else:
+            # The feed always publishes a full reload before the first delta
+            self._snapshots[changes.table] = self._snapshots[changes.table].with_changes(rows, changes.watermark)
+            self.delta_rows += len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tables": {
+                name: {"rows": len(snapshot), "watermark": str(snapshot.watermark) if snapshot.watermark else None}
+                for name, snapshot in self._snapshots.items()
+            },
+            "full_loads": self.full_loads,
+            "delta_rows": self.delta_rows,
+        }
@@ -0,0 +1,171 @@
+# change_feed.py
+# Polls tables for rows past their UpdatedAt watermark and publishes the changed rows to subscribers.
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+from sqlalchemy import and_, or_, select
+
+@dataclass(frozen=True)
+class TableChanges:
+    table: str
+    # Changed rows with the watched columns as attributes, e.g. row.ProductId
+    rows: List[Any]
+    # True when rows is the whole table and replaces whatever the subscriber holds
+    full: bool
+    watermark: Any = None
+
+@dataclass
+class WatchedTable:
+    model: Any
+    key: str
+    columns: List[Any]
+    subscribers: List[Callable[[TableChanges], None]] = field(default_factory=list)
+    watermark: Any = None
+    # Keys of the rows already published with UpdatedAt equal to the watermark
+    at_watermark: Set[Any] = field(default_factory=set)
+    # Highest primary key seen, so inserts that leave UpdatedAt NULL are still picked up
+    max_key: Any = None
+    loaded_at: Optional[float] = None
+    full_loads: int = 0
+    delta_rows: int = 0
+
+class ChangeFeed:
+    """One polling thread that keeps derived structures in step with the catalog tables.
+
+    Each pass runs one query per table for rows with UpdatedAt >= the table's watermark (rows
+    already published at exactly the watermark are skipped, so writes sharing a timestamp are
+    not lost), plus rows with a NULL UpdatedAt and a primary key above the highest one seen
+    (the backend leaves UpdatedAt NULL on insert), and hands them to the table's subscribers
+    as a TableChanges delta. A full reload is published first, every full_resync seconds, and
+    after a subscriber fails; that is also how deletes and late commits with older timestamps
+    arrive.
+    """
+
+    def __init__(self, session_factory: Callable, interval: float, full_resync: float = 3600):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.full_resync = full_resync
+        self._tables: Dict[str, WatchedTable] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.polls = 0
+
+    def watch(self, model, columns: Optional[Sequence[str]] = None) -> str:
+        """Track a model's table (all columns unless given) under its table name"""
+        table = model.__table__
+        names = list(columns) if columns is not None else [column.name for column in table.columns]
+        if "UpdatedAt" not in names:
+            names.append("UpdatedAt")
+        self._tables[table.name] = WatchedTable(model, list(table.primary_key.columns)[0].name,
+                                                [table.c[name] for name in names])
+        return table.name
+
+    def subscribe(self, table: str, callback: Callable[[TableChanges], None]):
+        watched = self._tables[table]
+        watched.subscribers.append(callback)
+        # A late subscriber needs the whole table before it can apply deltas
+        watched.loaded_at = None
+
+    def resync(self, table: Optional[str] = None):
+        """Publish a full reload of the table (or of every table) on the next pass"""
+        for name, watched in self._tables.items():
+            if table is None or name == table:
+                watched.loaded_at = None
+
+    def _advance(self, watched: WatchedTable, rows: List[Any]):
+        for row in rows:
+            key = getattr(row, watched.key)
+            if watched.max_key is None or key > watched.max_key:
+                watched.max_key = key
+            updated = row.UpdatedAt
+            if updated is None:
+                continue
+            if watched.watermark is None or updated > watched.watermark:
+                watched.watermark = updated
+                watched.at_watermark = {getattr(row, watched.key)}
+            elif updated == watched.watermark:
+                watched.at_watermark.add(getattr(row, watched.key))
+
+    def poll(self, db, table: str) -> Optional[TableChanges]:
+        """Fetch one table's changes since the last poll; None when nothing changed"""
+        watched = self._tables[table]
+        query = select(*watched.columns)
+        full = watched.loaded_at is None or time.monotonic() - watched.loaded_at >= self.full_resync
+        if full:
+            rows = db.execute(query).all()
+            watched.watermark, watched.at_watermark, watched.max_key = None, set(), None
+            watched.loaded_at = time.monotonic()
+            watched.full_loads += 1
+        else:
+            columns = watched.model.__table__.c
+            updated = columns.UpdatedAt
+            changed = updated.isnot(None) if watched.watermark is None else updated >= watched.watermark
+            if watched.max_key is not None:
+                changed = or_(changed, and_(updated.is_(None), columns[watched.key] > watched.max_key))
+            query = query.where(changed)
+            rows = [
+                row for row in db.execute(query).all()
+                if row.UpdatedAt != watched.watermark or getattr(row, watched.key) not in watched.at_watermark
+            ]
+            if not rows:
+                return None
+            watched.delta_rows += len(rows)
+        self._advance(watched, rows)
+        return TableChanges(table, rows, full, watched.watermark)
+
+    def publish(self, changes: TableChanges):
+        watched = self._tables[changes.table]
+        for callback in watched.subscribers:
+            try:
+                callback(changes)
+            except Exception as ex:
+                # The subscriber may now be missing these rows; start it over from the whole table
+                watched.loaded_at = None
+                print(f"Warning: {changes.table} change subscriber failed: {ex}")
+
+    def refresh(self):
+        db = self.session_factory()
+        try:
+            for table, watched in self._tables.items():
+                if not watched.subscribers:
+                    continue
+                changes = self.poll(db, table)
+                if changes is not None:
+                    self.publish(changes)
+            self.polls += 1
+        finally:
+            db.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as ex:
+                print(f"Warning: change feed poll failed: {ex}")
+            if self.interval <= 0 or self._stop.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "polls": self.polls,
+            "tables": {
+                name: {
+                    "subscribers": len(watched.subscribers),
+                    "watermark": str(watched.watermark) if watched.watermark is not None else None,
+                    "full_loads": watched.full_loads,
+                    "delta_rows": watched.delta_rows,
+                }
+                for name, watched in self._tables.items()
+            },
+        }
@@ -0,0 +1,104 @@
+# config.py
+# Runtime settings for the chatbot API, read from the environment with local defaults.
+import os
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+def env_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+# Database
+DATABASE_URL = os.getenv('DATABASE_URL', "mssql+pyodbc://sa:kiran@HP\\SQLEXPRESS/ECommerceDB?driver=ODBC+Driver+17+for+SQL+Server")
+# Run light ORM reads (history, suggestions) on an async engine (aioodbc / aiosqlite) instead of the
+# thread pool. Chat turns always use the thread pool: building a reply is CPU work that would block the loop
+ASYNC_DB = env_bool("ASYNC_DB")
+# Explicit async URL; derived from DATABASE_URL when empty
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "")
+
+# Connection pool
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 10)
+# Seconds to wait for a free connection before failing the request
+DB_POOL_TIMEOUT = env_int("DB_POOL_TIMEOUT", 30)
+# Reconnect connections older than this many seconds, before the server or a firewall drops them
+DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", 1800)
+# Test each connection on checkout and transparently replace stale ones
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+# Connections opened at startup so the first requests skip the connect latency
+DB_POOL_WARM = env_int("DB_POOL_WARM", 5)
+
+# NLP
+# Threads that run spaCy parsing off the event loop
+NLP_THREADS = env_int("NLP_THREADS", 4)
+# spaCy pipeline profile: full, trimmed (skip unused components) or regex (skip spaCy when the rules suffice)
+NLP_PROFILE = os.getenv("NLP_PROFILE", "trimmed").strip().lower()
+# Worker processes for spaCy analysis; 0 keeps parsing on the in-process thread pool
+NLP_WORKERS = env_int("NLP_WORKERS", 0)
+NLP_WORKER_BATCH_SIZE = env_int("NLP_WORKER_BATCH_SIZE", 16)
+# Messages allowed in flight on the worker pool before /chatbot answers 503
+NLP_MAX_PENDING = env_int("NLP_MAX_PENDING", 256)
+NLP_WORKER_START_METHOD = os.getenv("NLP_WORKER_START_METHOD", "spawn")
+# Micro-batch concurrent messages through nlp.pipe in this process (ignored when NLP_WORKERS > 0)
+NLP_MICRO_BATCHING = env_bool("NLP_MICRO_BATCHING")
+NLP_BATCH_MAX_SIZE = env_int("NLP_BATCH_MAX_SIZE", 16)
+NLP_BATCH_MAX_WAIT_MS = env_int("NLP_BATCH_MAX_WAIT_MS", 5)
+
+# Response cache for read-only intents; a size or TTL of 0 disables it
+RESPONSE_CACHE_SIZE = env_int("RESPONSE_CACHE_SIZE", 512)
+RESPONSE_CACHE_TTL = env_int("RESPONSE_CACHE_TTL", 60)
+
+# Seconds between background refreshes of the table-count snapshot; 0 always counts live
+STATS_SNAPSHOT_INTERVAL = env_int("STATS_SNAPSHOT_INTERVAL", 0)
+
+# Fuzzy name search index for products and suppliers; kept current by the change feed
+SEARCH_INDEX_ENABLED = env_bool("SEARCH_INDEX_ENABLED", True)
+
+# Buffer chat messages and write them in bulk instead of inside each request
+MESSAGE_WRITE_BEHIND = env_bool("MESSAGE_WRITE_BEHIND")
+MESSAGE_FLUSH_INTERVAL_MS = env_int("MESSAGE_FLUSH_INTERVAL_MS", 200)
+MESSAGE_FLUSH_BATCH = env_int("MESSAGE_FLUSH_BATCH", 100)
+# Chat turns the buffer holds before requests fall back to writing inline
+MESSAGE_QUEUE_SIZE = env_int("MESSAGE_QUEUE_SIZE", 10000)
+
+# Seconds between flushes of in-memory suggestion usage counts to the database
+SUGGESTION_FLUSH_INTERVAL = env_int("SUGGESTION_FLUSH_INTERVAL", 30)
+
+# Conversations idle for this many days move to the messages_archive table; 0 disables archiving
+MESSAGE_RETENTION_DAYS = env_int("MESSAGE_RETENTION_DAYS", 0)
+# Hours between archive runs, and conversations moved per transaction
+ARCHIVE_INTERVAL_HOURS = env_int("ARCHIVE_INTERVAL_HOURS", 24)
+ARCHIVE_BATCH_SIZE = env_int("ARCHIVE_BATCH_SIZE", 500)
+
+# Load the spaCy model before serving instead of in the background after startup
+NLP_EAGER_LOAD = env_bool("NLP_EAGER_LOAD")
+
+# Rows shown by list intents before the reply ends with "…and N more", and rows fetched per round-trip
+LIST_RESULT_LIMIT = env_int("LIST_RESULT_LIMIT", 10)
+LIST_YIELD_PER = env_int("LIST_YIELD_PER", 100)
+
+# Most messages accepted by one /chatbot/batch request
+CHATBOT_BATCH_MAX = env_int("CHATBOT_BATCH_MAX", 100)
+
+# Time every SQL statement through engine events for /metrics
+DB_QUERY_METRICS = env_bool("DB_QUERY_METRICS", True)
+# Start the sampling profiler with the app; it can also be toggled at runtime via POST /profiler
+PROFILER_ENABLED = env_bool("PROFILER_ENABLED")
+PROFILER_INTERVAL_MS = env_int("PROFILER_INTERVAL_MS", 10)
+# Distinct stacks the profiler keeps; samples of further stacks are counted together
+PROFILER_MAX_STACKS = env_int("PROFILER_MAX_STACKS", 10000)
+
+# Serve product and supplier attribute lookups from an in-memory snapshot kept current by the change feed
+CATALOG_SNAPSHOT_ENABLED = env_bool("CATALOG_SNAPSHOT_ENABLED", True)
+
+# Seconds between UpdatedAt polls of the catalog tables, and between full reloads
+# (which also pick up deleted rows and rows written without UpdatedAt)
+CHANGE_FEED_INTERVAL = env_int("CHANGE_FEED_INTERVAL", 30)
+CHANGE_FEED_FULL_RESYNC = env_int("CHANGE_FEED_FULL_RESYNC", 3600)
+
+# Rendered listing lines kept per table for reuse until their row changes; 0 formats every row on every reply
+LIST_FRAGMENT_CACHE_SIZE = env_int("LIST_FRAGMENT_CACHE_SIZE", 10000)
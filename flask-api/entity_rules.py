@@ -0,0 +1,76 @@
+# entity_rules.py
+# Declarative slot-extraction rules for chat messages, compiled once at import time.
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Pattern
+
+@dataclass(frozen=True)
+class EntityRule:
+    slot: str
+    patterns: List[str]
+    # Constant to store instead of the captured group (used for requested_field)
+    value: Any = None
+    convert: Callable[[str], Any] = str.strip
+    # Later rules for the same slot replace earlier values unless this is False
+    overwrite: bool = True
+
+# Applied in order; for each rule the first pattern that matches wins
+ENTITY_RULES = [
+    # Look for product names after terms like "find" or "search"
+    EntityRule("product_name", [r"find\s+([\w\s]+)", r"search\s+for\s+([\w\s]+)", r"looking\s+for\s+([\w\s]+)"]),
+
+    # Supplier name
+    EntityRule("supplier_name", [
+        r"(?:supplier|vendor)\s+([A-Za-z\s]+?)(?:\s+(?:email|phone|contact|address)|$)",
+        r"(?:email|phone|contact|address)\s+(?:of|for)\s+(?:supplier|vendor)\s+([A-Za-z\s]+)(?:\?|$)",
+        r"(?:email|phone|contact|address)\s+(?:of|for)\s+([A-Za-z\s]+)(?:\?|$)"
+    ]),
+
+    # Product price questions name the product more precisely than a search does
+    EntityRule("product_name", [
+        r"price\s+of\s+([\w\s\d]+?)(?:\?|$)",
+        r"how\s+much\s+(?:is|does|costs?)\s+([\w\s\d]+?)(?:\?|$)",
+        r"what(?:'s|\s+is)\s+the\s+price\s+of\s+([\w\s\d]+?)(?:\?|$)"
+    ]),
+
+    # What attribute/field they're looking for; the first field listed here wins
+    EntityRule("requested_field", [r"email\s+(?:id|address)", r"e-?mail"], value="email", overwrite=False),
+    EntityRule("requested_field", [r"phone\s+(?:number|no\.?)", r"contact\s+number"], value="phone", overwrite=False),
+    EntityRule("requested_field", [r"address", r"location"], value="address", overwrite=False),
+    EntityRule("requested_field", [r"price", r"cost", r"how much"], value="price", overwrite=False),
+    EntityRule("requested_field", [r"stock", r"inventory", r"available"], value="stock", overwrite=False),
+
+    # Numbers for potential quantities or IDs
+    EntityRule("quantity", [r"(\d+)\s+(?:products?|items?|users?)"], convert=int),
+]
+
+class EntityExtractor:
+    """Runs a compiled rule table over a message and returns every slot it fills"""
+
+    def __init__(self, rules: List[EntityRule]):
+        self.rules = rules
+        self._compiled: List[List[Pattern]] = [
+            [re.compile(pattern, re.IGNORECASE) for pattern in rule.patterns]
+            for rule in rules
+        ]
+
+    def extract(self, message: str) -> Dict[str, Any]:
+        entities = {}
+        for rule, patterns in zip(self.rules, self._compiled):
+            if not rule.overwrite and rule.slot in entities:
+                continue
+            match = self._first_match(patterns, message)
+            if match:
+                entities[rule.slot] = rule.value if rule.value is not None else rule.convert(match.group(1))
+        return entities
+
+    @staticmethod
+    def _first_match(patterns: List[Pattern], message: str) -> Optional[re.Match]:
+        for pattern in patterns:
+            match = pattern.search(message)
+            if match:
+                return match
+        return None
+
+# Built once at import time
+entity_extractor = EntityExtractor(ENTITY_RULES)
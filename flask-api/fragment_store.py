@@ -0,0 +1,64 @@
+# fragment_store.py
+# Rendered reply lines for individual rows, reused until the row changes.
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+class FragmentStore:
+    """Rendered lines per listing, keyed by primary key and tagged with the row's version.
+
+    The version is the row's UpdatedAt, or the row's own values for tables without one (or
+    rows whose UpdatedAt is NULL). A stored line is reused while the version matches and
+    replaced when the row has changed, so a listing only formats the rows written since it
+    was last built. Lookups are single dict operations, which the GIL keeps consistent
+    across request threads; a listing's lines are dropped wholesale when it outgrows
+    max_entries.
+
+    Each renderer() keeps its own lines, so two listings of one table with different line
+    formats never serve each other's text.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._listings: Dict[str, Dict[Hashable, Tuple[Any, str]]] = {}
+        # Approximate under concurrency; they only feed /fragments
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def renderer(self, listing: str, format_row: Callable, versioned: bool = True) -> Callable:
+        """format_row replacement for rows that end with the primary key, then UpdatedAt when versioned.
+
+        listing names the lines in stats(); a second renderer under the same name starts empty.
+        """
+        fragments = self._listings[listing] = {}
+
+        def render(row) -> str:
+            if versioned:
+                key, version = row[-2], row[-1]
+                if version is None:
+                    version = tuple(row)
+            else:
+                key, version = row[-1], tuple(row)
+            entry = fragments.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            if len(fragments) >= self.max_entries:
+                fragments.clear()
+            text = format_row(row)
+            fragments[key] = (version, text)
+            return text
+        return render
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": {listing: len(fragments) for listing, fragments in self._listings.items()},
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,58 @@
+# intent_classifier.py
+# Intent classification engine built once at import time from INTENT_PATTERNS.
+import re
+from dataclasses import dataclass
+from typing import List, Pattern, Tuple
+
+from intents import INTENT_PATTERNS, FALLBACK_INTENT_PATTERNS
+
+@dataclass(frozen=True)
+class IntentRule:
+    priority: int
+    intent: str
+    pattern: str
+    regex: Pattern
+
+@dataclass(frozen=True)
+class IntentMatch:
+    intent: str
+    pattern: str
+    span: Tuple[int, int]
+
+class IntentClassifier:
+    """Ordered, precompiled intent rules.
+
+    Rules are flattened once into an explicit priority list: intents in declaration order,
+    each intent's patterns in order, then the fallback patterns. The first rule that matches
+    anywhere in the message wins, which is exactly what the original nested loop did.
+    """
+
+    def __init__(self, intent_patterns, fallback_patterns=(), default_intent: str = "unknown"):
+        self.default_intent = default_intent
+        ordered = [(intent, pattern) for intent, patterns in intent_patterns.items() for pattern in patterns]
+        ordered.extend(fallback_patterns)
+        self.rules: List[IntentRule] = [
+            IntentRule(priority=priority, intent=intent, pattern=pattern, regex=re.compile(pattern, re.IGNORECASE))
+            for priority, (intent, pattern) in enumerate(ordered)
+        ]
+
+    def classify(self, message: str) -> str:
+        """Return the intent of the highest priority rule found in the message"""
+        message_lower = message.lower()
+        for rule in self.rules:
+            if rule.regex.search(message_lower):
+                return rule.intent
+        return self.default_intent
+
+    def matches(self, message: str) -> List[IntentMatch]:
+        """Return every matching rule with its span, highest priority first"""
+        message_lower = message.lower()
+        results = []
+        for rule in self.rules:
+            match = rule.regex.search(message_lower)
+            if match:
+                results.append(IntentMatch(intent=rule.intent, pattern=rule.pattern, span=match.span()))
+        return results
+
+# Built once at import time
+intent_classifier = IntentClassifier(INTENT_PATTERNS, FALLBACK_INTENT_PATTERNS)
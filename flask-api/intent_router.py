@@ -0,0 +1,94 @@
+# intent_router.py
+# Registry of reply handlers keyed by intent, with per-handler latency histograms.
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from metrics import LatencyHistogram
+
+@dataclass(frozen=True)
+class IntentHandler:
+    name: str
+    # (message, db, analysis) -> the reply, or an iterator of reply pieces
+    respond: Callable
+    # Slot that must have been extracted for the handler to apply
+    requires: Optional[str] = None
+    # Tables the reply reads; replies of handlers that declare tables are cacheable
+    tables: Tuple[str, ...] = ()
+
+class IntentRouter:
+    """Maps an intent to its handler with one dict lookup.
+
+    When the intent has no handler, or the handler's required slot is missing, the fallback
+    handlers are tried in registration order; the last one should require nothing.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, IntentHandler] = {}
+        self._fallbacks: List[IntentHandler] = []
+        self._latency: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def add(self, handler: IntentHandler):
+        self._handlers[handler.name] = handler
+
+    def handler(self, intent: str, requires: Optional[str] = None, tables: Tuple[str, ...] = ()):
+        """Decorator registering a function as the handler of an intent"""
+        def register(respond: Callable) -> Callable:
+            self.add(IntentHandler(intent, respond, requires, tables))
+            return respond
+        return register
+
+    def fallback(self, name: str, requires: Optional[str] = None):
+        """Decorator registering a function as the next fallback handler"""
+        def register(respond: Callable) -> Callable:
+            self._fallbacks.append(IntentHandler(name, respond, requires))
+            return respond
+        return register
+
+    def intents(self) -> List[str]:
+        return list(self._handlers)
+
+    def resolve(self, intent: str, entities: Dict[str, Any]) -> IntentHandler:
+        handler = self._handlers.get(intent)
+        if handler is not None and (handler.requires is None or handler.requires in entities):
+            return handler
+        for handler in self._fallbacks:
+            if handler.requires is None or handler.requires in entities:
+                return handler
+        raise LookupError(f"No handler for intent '{intent}'")
+
+    def dispatch(self, handler: IntentHandler, *args) -> Iterator[str]:
+        """Yield the handler's reply pieces, timing only the handler's own work, not the consumer's"""
+        started = time.perf_counter()
+        reply = handler.respond(*args)
+        elapsed = time.perf_counter() - started
+        if isinstance(reply, str):
+            self._histogram(handler.name).observe(elapsed)
+            yield reply
+            return
+        pieces = iter(reply)
+        while True:
+            started = time.perf_counter()
+            try:
+                piece = next(pieces)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - started
+            yield piece
+        self._histogram(handler.name).observe(elapsed)
+
+    def _histogram(self, name: str) -> LatencyHistogram:
+        histogram = self._latency.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._latency.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def histograms(self) -> Dict[str, LatencyHistogram]:
+        return dict(self._latency)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: histogram.stats() for name, histogram in sorted(self._latency.items())}
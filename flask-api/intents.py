@@ -177,3 +177,11 @@ INTENT_PATTERNS = {
     ],
 }
 
+
+# Checked only after every pattern above has failed, in this order
+FALLBACK_INTENT_PATTERNS = [
+    # Query is about specific supplier info
+    ("supplier_contact", r"(email|phone|contact|address)\s+(?:of|for|details)"),
+    # Query is about product price
+    ("product_price", r"(price|cost|how much)"),
+]
@@ -0,0 +1,97 @@
+# message_writer.py
+# Write-behind buffer that persists chat rows in bulk inserts off the request path.
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+
+class WriteBehindBuffer:
+    """Bounded queue of row groups flushed to one table every flush_interval_ms or batch_size rows.
+
+    add() queues the rows of one chat turn together and never blocks: it returns False when
+    the queue is full so the caller can write the rows itself. close() stops the flusher and
+    writes whatever is still queued.
+    """
+
+    def __init__(self, session_factory: Callable, model, batch_size: int = 100,
+                 flush_interval_ms: int = 200, max_queue: int = 10000):
+        self.session_factory = session_factory
+        self.model = model
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue: "queue.Queue[List[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.rejected_rows = 0
+
+    def add(self, rows: List[Dict[str, Any]]) -> bool:
+        try:
+            self._queue.put_nowait(rows)
+            return True
+        except queue.Full:
+            self.rejected_rows += len(rows)
+            return False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="message-writer", daemon=True)
+        self._thread.start()
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.extend(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._take_batch()
+            if batch:
+                self.flush(batch)
+
+    def flush(self, rows: List[Dict[str, Any]]):
+        db = self.session_factory()
+        try:
+            db.execute(insert(self.model), rows)
+            db.commit()
+            self.flushes += 1
+            self.flushed_rows += len(rows)
+        except Exception as ex:
+            db.rollback()
+            self.failed_rows += len(rows)
+            print(f"Warning: failed to write {len(rows)} {self.model.__tablename__} rows: {ex}")
+        finally:
+            db.close()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        remaining = []
+        while True:
+            try:
+                remaining.extend(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(remaining), self.batch_size):
+            self.flush(remaining[start:start + self.batch_size])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued_turns": self._queue.qsize(),
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+            "rejected_rows": self.rejected_rows,
+        }
@@ -0,0 +1,263 @@
+# metrics.py
+# In-process counters and latency histograms rendered in the Prometheus text format,
+# SQLAlchemy query timing hooks and an on-demand sampling profiler.
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Upper bounds of the latency buckets in milliseconds; slower observations land in an overflow bucket
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with a running count and sum"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._counts[bisect_left(self.buckets, seconds * 1000)] += 1
+            self.count += 1
+            self.total += seconds
+
+    def snapshot(self) -> Tuple[List[int], int, float]:
+        with self._lock:
+            return list(self._counts), self.count, self.total
+
+    def stats(self) -> Dict[str, Any]:
+        counts, count, total = self.snapshot()
+        labels = [f"<={bound}ms" for bound in self.buckets] + [f">{self.buckets[-1]}ms"]
+        return {
+            "count": count,
+            "avg_ms": round(total / count * 1000, 3) if count else 0.0,
+            "buckets": dict(zip(labels, counts)),
+        }
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Metrics:
+    """Named, labelled counters and histograms.
+
+    Names get the prefix when rendered, e.g. observe("stage_seconds", 0.01, stage="nlp") is
+    exported as chatbot_stage_seconds{stage="nlp"}. Histograms owned elsewhere (such as the
+    intent router's) are exported through add_histograms().
+    """
+
+    def __init__(self, prefix: str = "chatbot"):
+        self.prefix = prefix
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, LatencyHistogram]] = {}
+        self._collectors: List[Tuple[str, str, Callable[[], Dict[str, LatencyHistogram]]]] = []
+        self._gauges: List[Tuple[str, Callable[[], Dict[Labels, float]]]] = []
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def histogram(self, name: str, **labels) -> LatencyHistogram:
+        key = tuple(sorted(labels.items()))
+        series = self._histograms.get(name)
+        histogram = series.get(key) if series is not None else None
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, {}).setdefault(key, LatencyHistogram())
+        return histogram
+
+    def observe(self, name: str, seconds: float, **labels):
+        self.histogram(name, **labels).observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def add_histograms(self, name: str, label: str, collect: Callable[[], Dict[str, LatencyHistogram]]):
+        """Export histograms kept elsewhere, one series per key of collect()'s result"""
+        self._collectors.append((name, label, collect))
+
+    def add_gauge(self, name: str, collect: Callable[[], Dict[Labels, float]]):
+        """Export values read at scrape time, e.g. connection pool usage"""
+        self._gauges.append((name, collect))
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+        for name, label, collect in self._collectors:
+            histograms.setdefault(name, {}).update(
+                {((label, key),): histogram for key, histogram in collect().items()}
+            )
+
+        for name, series in sorted(counters.items()):
+            lines.append(f"# TYPE {self.prefix}_{name} counter")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{self.prefix}_{name}{format_labels(labels)} {value}")
+        for name, collect in self._gauges:
+            lines.append(f"# TYPE {self.prefix}_{name} gauge")
+            for labels, value in sorted(collect().items()):
+                lines.append(f"{self.prefix}_{name}{format_labels(labels)} {value}")
+        for name, series in sorted(histograms.items()):
+            lines.append(f"# TYPE {self.prefix}_{name} histogram")
+            for labels, histogram in sorted(series.items()):
+                counts, count, total = histogram.snapshot()
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets, counts):
+                    cumulative += bucket_count
+                    bucket_labels = format_labels(labels, 'le="%s"' % (bound / 1000))
+                    lines.append(f"{self.prefix}_{name}_bucket{bucket_labels} {cumulative}")
+                bucket_labels = format_labels(labels, 'le="+Inf"')
+                lines.append(f"{self.prefix}_{name}_bucket{bucket_labels} {count}")
+                lines.append(f"{self.prefix}_{name}_sum{format_labels(labels)} {total}")
+                lines.append(f"{self.prefix}_{name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+class QueryTally:
+    """Queries run and time spent in them within one track_queries() block"""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+_query_tally: ContextVar[Optional[QueryTally]] = ContextVar("query_tally", default=None)
+
+@contextmanager
+def track_queries(tally: Optional[QueryTally] = None) -> Iterator[QueryTally]:
+    """Count the queries issued by the current thread (or greenlet) inside the block.
+
+    Pass the tally of an earlier block to keep adding to it, e.g. across the steps of a
+    generator that Starlette runs one next() at a time, each in a fresh copy of the context.
+    """
+    tally = tally if tally is not None else QueryTally()
+    token = _query_tally.set(tally)
+    try:
+        yield tally
+    finally:
+        _query_tally.reset(token)
+
+def instrument_engine(engine, metrics: Metrics):
+    """Time every statement on a sync Engine (pass async_engine.sync_engine for async engines)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        metrics.observe("db_query_seconds", elapsed, operation=operation)
+        tally = _query_tally.get()
+        if tally is not None:
+            tally.queries += 1
+            tally.seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # A failed statement never reaches after_cursor_execute
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+        metrics.inc("db_query_errors_total")
+
+class SamplingProfiler:
+    """Samples the stack of every other thread each interval and counts the collapsed stacks.
+
+    The result is the usual flame-graph input ("outer;inner;leaf" -> samples), so a hot
+    function shows up without attaching a debugger or restarting the process. Frames are
+    named by file and function, not line, so the number of distinct stacks stays small;
+    past max_stacks, samples of new stacks are counted under OVERFLOW_STACK.
+    """
+
+    OVERFLOW_STACK = "[other stacks]"
+
+    def __init__(self, interval_ms: int = 10, max_depth: int = 40, max_stacks: int = 10000):
+        self.interval = interval_ms / 1000
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self._stacks: Counter = Counter()
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms: Optional[int] = None):
+        if interval_ms:
+            self.interval = interval_ms / 1000
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def _collapse(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks = [self._collapse(frame) for thread_id, frame in sys._current_frames().items() if thread_id != own_id]
+            with self._lock:
+                for stack in stacks:
+                    if stack not in self._stacks and len(self._stacks) >= self.max_stacks:
+                        stack = self.OVERFLOW_STACK
+                    self._stacks[stack] += 1
+                self.samples += 1
+
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        with self._lock:
+            stacks = self._stacks.most_common(top)
+            leaves = Counter()
+            for stack, count in self._stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            samples = self.samples
+        return {
+            "running": self.running,
+            "interval_ms": round(self.interval * 1000, 3),
+            "samples": samples,
+            "top_functions": [{"function": name, "samples": count} for name, count in leaves.most_common(top)],
+            "top_stacks": [{"stack": stack, "samples": count} for stack, count in stacks],
+        }
@@ -0,0 +1,92 @@
+# nlp_batcher.py
+# Groups concurrent chat messages into small batches so spaCy can parse them with nlp.pipe.
+import asyncio
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+class MicroBatcher:
+    """Collects submitted items for up to max_wait_ms or max_batch_size items, then processes them together.
+
+    process_batch takes a list of items and returns one result per item in the same order.
+    It runs on the given executor so the event loop stays free while a batch is parsed.
+    The wait adapts to load: after a batch of one the next batch is dispatched as soon as
+    an item arrives, and the full wait only applies while batches are actually filling up.
+    """
+
+    def __init__(self, process_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = 16,
+                 max_wait_ms: float = 5.0, executor=None):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_batch_size = 0
+        self.batch_sizes: Counter = Counter()
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> List[tuple]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        wait = self.max_wait if self._last_batch_size > 1 else 0
+        deadline = loop.time() + wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            self._last_batch_size = len(batch)
+            self.batch_sizes[len(batch)] += 1
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.process_batch, items)
+            except Exception as ex:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(ex)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        batches = sum(self.batch_sizes.values())
+        items = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": batches,
+            "messages": items,
+            "avg_batch_size": round(items / batches, 2) if batches else 0.0,
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
@@ -0,0 +1,200 @@
+# nlp_pipeline.py
+# Message analysis: one spaCy parse per message shared by intent and entity extraction.
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from config import NLP_PROFILE
+from intent_classifier import intent_classifier
+from entity_rules import entity_extractor
+
+# Pipeline profiles:
+#   full    - every component of the model, as loaded by spacy.load
+#   trimmed - no lemmatizer, and each call only runs the components its caller reads
+#   regex   - trimmed, and spaCy is skipped when the compiled rules already settle the reply
+PROFILES = ("full", "trimmed", "regex")
+if NLP_PROFILE not in PROFILES:
+    print(f"Warning: unknown NLP_PROFILE '{NLP_PROFILE}'. Using the full pipeline.")
+    NLP_PROFILE = "full"
+
+# Components never read from the Doc; excluded at load time by the trimmed profiles
+EXCLUDED_COMPONENTS = ["lemmatizer"]
+
+# Components each code path reads: noun chunks need the parser and POS tags
+# (tagger + attribute_ruler), doc.ents needs the entity recognizer
+TASK_COMPONENTS = {
+    "analyze": {"tok2vec", "tagger", "attribute_ruler", "parser", "ner"},
+    "noun_chunks": {"tok2vec", "tagger", "attribute_ruler", "parser"},
+}
+
+# Intents whose reply ignores the extracted slots, so a rule match alone settles them
+RULE_ONLY_INTENTS = {
+    "list_products", "product_categories", "out_of_stock", "product_count", "brands",
+    "list_users", "user_permissions", "suppliers", "database_info", "help",
+}
+
+# spaCy NLP model, loaded on first use or by warm_up() so importing this module stays cheap
+_nlp = None
+_nlp_lock = threading.Lock()
+
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                import spacy
+                exclude = EXCLUDED_COMPONENTS if NLP_PROFILE != "full" else []
+                try:
+                    _nlp = spacy.load("en_core_web_sm", exclude=exclude)
+                except OSError:
+                    print("Warning: spaCy model not found. Using small model.")
+                    _nlp = spacy.blank("en")
+    return _nlp
+
+def disabled_components(task: str) -> List[str]:
+    """Loaded components a task does not need; none for the full profile"""
+    if NLP_PROFILE == "full":
+        return []
+    return [name for name in get_nlp().pipe_names if name not in TASK_COMPONENTS[task]]
+
+def parse(message: str, task: str = "analyze"):
+    # disable= skips components for this call only, so it is safe with concurrent callers
+    return get_nlp()(message, disable=disabled_components(task))
+
+def nlp_ready() -> bool:
+    return _nlp is not None
+
+def warm_up():
+    """Load the model and run one parse so the first request does not pay for lazy initialisation"""
+    get_nlp()("warm up")
+
+def warm_up_in_background() -> threading.Thread:
+    thread = threading.Thread(target=warm_up, name="nlp-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+# Result of running the NLP stage once over a message
+@dataclass
+class MessageAnalysis:
+    text: str
+    doc: Any
+    intent: str
+    entities: Dict[str, Any] = field(default_factory=dict)
+    spacy_entities: List[Dict[str, str]] = field(default_factory=list)
+    # Seconds spent per stage ("parse", "intent", "entities") while producing this analysis
+    timings: Dict[str, float] = field(default_factory=dict)
+
+def analyze_with_rules(message: str) -> Optional[MessageAnalysis]:
+    """Intent and slots from the compiled rules alone, or None when the reply still needs spaCy.
+
+    The noun-chunk fallback only runs when the rules found no product or supplier name, and
+    RULE_ONLY_INTENTS never read slots, so in both cases the reply is the one the full parse
+    would give. Only the spaCy entity list is left empty.
+    """
+    started = time.perf_counter()
+    intent = classify_intent(message)
+    classified = time.perf_counter()
+    entities = entity_extractor.extract(message)
+    if "product_name" in entities or "supplier_name" in entities or intent in RULE_ONLY_INTENTS:
+        timings = {"intent": classified - started, "entities": time.perf_counter() - classified}
+        return MessageAnalysis(text=message, doc=None, intent=intent, entities=entities, timings=timings)
+    return None
+
+def analyze_message(message: str) -> MessageAnalysis:
+    """Parse a message once and derive intent, slot entities and spaCy entities from the same Doc"""
+    if NLP_PROFILE == "regex":
+        analysis = analyze_with_rules(message)
+        if analysis is not None:
+            return analysis
+    started = time.perf_counter()
+    doc = parse(message)
+    return analysis_from_doc(message, doc, time.perf_counter() - started)
+
+def analysis_from_doc(message: str, doc, parse_seconds: float, keep_doc: bool = True) -> MessageAnalysis:
+    started = time.perf_counter()
+    intent = classify_intent(message)
+    classified = time.perf_counter()
+    entities = extract_entities(message, doc)
+    return MessageAnalysis(
+        text=message,
+        doc=doc if keep_doc else None,
+        intent=intent,
+        entities=entities,
+        spacy_entities=[{"label": ent.label_, "text": ent.text} for ent in doc.ents],
+        timings={"parse": parse_seconds, "intent": classified - started, "entities": time.perf_counter() - classified}
+    )
+
+# Improved entity extraction function
+def extract_entities(message: str, doc=None) -> Dict[str, Any]:
+    # Slots from the compiled rule table (product, supplier, field, quantity)
+    entities = entity_extractor.extract(message)
+
+    # If no specific product name was found, try to find noun chunks
+    if "product_name" not in entities and "supplier_name" not in entities:
+        # Reuse an already parsed Doc when the caller has one
+        if doc is None:
+            doc = parse(message, "noun_chunks")
+        for chunk in doc.noun_chunks:
+            # Skip chunks that are likely not product or supplier names
+            skip_terms = ["product", "category", "user", "database", "list", "all", "email", "phone"]
+            if not any(term in chunk.text.lower() for term in skip_terms):
+                # Check if this could be a proper name (potential supplier)
+                is_proper = any(token.pos_ == "PROPN" for token in chunk)
+                if is_proper:
+                    entities["supplier_name"] = chunk.text
+                else:
+                    entities["product_name"] = chunk.text
+                break
+
+    return entities
+
+# Determine user intent from message
+def classify_intent(message: str) -> str:
+    return intent_classifier.classify(message)
+
+def analyze_batch(messages: List[str], batch_size: Optional[int] = None, keep_doc: bool = True) -> List[MessageAnalysis]:
+    """Analyze several messages with nlp.pipe, which is much cheaper per document than nlp() calls"""
+    analyses: List[Optional[MessageAnalysis]] = [None] * len(messages)
+    if NLP_PROFILE == "regex":
+        analyses = [analyze_with_rules(message) for message in messages]
+    pending = [position for position, analysis in enumerate(analyses) if analysis is None]
+    if not pending:
+        return analyses
+    started = time.perf_counter()
+    docs = list(get_nlp().pipe(
+        [messages[position] for position in pending],
+        batch_size=batch_size or max(len(pending), 1),
+        disable=disabled_components("analyze")
+    ))
+    # nlp.pipe parses the batch as a whole; charge each message an equal share
+    parse_seconds = (time.perf_counter() - started) / len(pending)
+    for position, doc in zip(pending, docs):
+        analyses[position] = analysis_from_doc(messages[position], doc, parse_seconds, keep_doc)
+    return analyses
+
+class TierStats:
+    """Per-tier message counts and latency, e.g. "regex" versus "spacy" """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers: Dict[str, List[float]] = {}
+
+    def record(self, tier: str, seconds: float):
+        with self._lock:
+            totals = self._tiers.setdefault(tier, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                tier: {
+                    "messages": count,
+                    "avg_ms": round(total / count * 1000, 3),
+                    "max_ms": round(slowest * 1000, 3),
+                }
+                for tier, (count, total, slowest) in self._tiers.items()
+            }
+
+tier_stats = TierStats()
@@ -0,0 +1,190 @@
+# nlp_pool.py
+# Pre-started worker processes that each load the spaCy model once and analyze messages in batches.
+import itertools
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+class NLPPoolBusy(Exception):
+    """Raised when the pool already holds its maximum number of pending messages"""
+
+class NLPWorkerCrashed(Exception):
+    """Raised for messages that were in flight on a worker process that died"""
+
+def _worker_main(worker_id: int, jobs, results, batch_size: int):
+    # Load the spaCy model once for the lifetime of this process before reporting ready
+    from nlp_pipeline import analyze_batch, warm_up
+
+    warm_up()
+    results.put(("ready", worker_id, None))
+    stopping = False
+    while not stopping:
+        job = jobs.get()
+        if job is None:
+            break
+
+        # Take whatever else is already queued, up to one batch
+        batch = [job]
+        while len(batch) < batch_size:
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                stopping = True
+                break
+            batch.append(job)
+
+        job_ids = [job_id for job_id, _ in batch]
+        try:
+            analyses = analyze_batch([text for _, text in batch], keep_doc=False)
+            results.put(("done", worker_id, list(zip(job_ids, analyses))))
+        except Exception as ex:
+            results.put(("failed", worker_id, (job_ids, repr(ex))))
+
+@dataclass
+class _Worker:
+    process: Any
+    jobs: Any
+    ready: bool = False
+    inflight: Dict[int, Future] = field(default_factory=dict)
+
+class NLPWorkerPool:
+    """Fixed-size pool of NLP processes fed through per-worker job queues.
+
+    Each message goes to the worker with the fewest messages in flight, and workers drain
+    their queue in batches of up to batch_size through nlp.pipe. submit() raises NLPPoolBusy
+    once max_pending messages are outstanding so callers can shed load instead of queueing
+    without bound. A monitor thread restarts dead workers and fails their in-flight messages
+    with NLPWorkerCrashed.
+
+    Workers use the "spawn" start method by default, which re-imports the main module, so run
+    the API with `uvicorn app:app` when the pool is enabled.
+    """
+
+    def __init__(self, size: int, batch_size: int = 16, max_pending: int = 256,
+                 health_interval: float = 1.0, start_method: str = "spawn"):
+        self.size = size
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.health_interval = health_interval
+        self._ctx = multiprocessing.get_context(start_method)
+        self._results = None
+        self._collector = None
+        self._workers: Dict[int, _Worker] = {}
+        self._job_owner: Dict[int, int] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self.restarts = 0
+        self.batches = 0
+        self.batched_messages = 0
+
+    def start(self):
+        self._results = self._ctx.Queue()
+        for worker_id in range(self.size):
+            self._spawn(worker_id)
+        self._collector = threading.Thread(target=self._collect, name="nlp-pool-collector", daemon=True)
+        self._collector.start()
+        threading.Thread(target=self._monitor, name="nlp-pool-monitor", daemon=True).start()
+
+    def _spawn(self, worker_id: int):
+        jobs = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, jobs, self._results, self.batch_size),
+            name=f"nlp-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self._workers[worker_id] = _Worker(process=process, jobs=jobs)
+
+    def submit(self, message: str) -> Future:
+        """Queue a message for analysis; the future resolves to a MessageAnalysis without a Doc"""
+        future = Future()
+        with self._lock:
+            if self._closed.is_set():
+                raise RuntimeError("NLP worker pool is closed")
+            if len(self._job_owner) >= self.max_pending:
+                raise NLPPoolBusy(f"{len(self._job_owner)} messages already pending")
+            job_id = next(self._ids)
+            worker_id, worker = min(self._workers.items(), key=lambda item: len(item[1].inflight))
+            worker.inflight[job_id] = future
+            self._job_owner[job_id] = worker_id
+            worker.jobs.put((job_id, message))
+        return future
+
+    def _pop(self, worker_id: int, job_id: int):
+        with self._lock:
+            if self._job_owner.get(job_id) != worker_id:
+                return None
+            del self._job_owner[job_id]
+            return self._workers[worker_id].inflight.pop(job_id, None)
+
+    def _collect(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                return
+            kind, worker_id, payload = message
+            if kind == "ready":
+                self._workers[worker_id].ready = True
+            elif kind == "done":
+                self.batches += 1
+                self.batched_messages += len(payload)
+                for job_id, analysis in payload:
+                    future = self._pop(worker_id, job_id)
+                    if future is not None:
+                        future.set_result(analysis)
+            elif kind == "failed":
+                job_ids, error = payload
+                for job_id in job_ids:
+                    future = self._pop(worker_id, job_id)
+                    if future is not None:
+                        future.set_exception(RuntimeError(f"NLP worker {worker_id} failed: {error}"))
+
+    def _monitor(self):
+        while not self._closed.wait(self.health_interval):
+            for worker_id, worker in list(self._workers.items()):
+                if worker.process.is_alive():
+                    continue
+                with self._lock:
+                    orphaned = worker.inflight
+                    for job_id in orphaned:
+                        self._job_owner.pop(job_id, None)
+                    self.restarts += 1
+                    self._spawn(worker_id)
+                for future in orphaned.values():
+                    future.set_exception(NLPWorkerCrashed(
+                        f"NLP worker {worker_id} exited with code {worker.process.exitcode}"
+                    ))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            workers = list(self._workers.values())
+            pending = len(self._job_owner)
+        return {
+            "size": self.size,
+            "alive": sum(1 for worker in workers if worker.process.is_alive()),
+            "ready": sum(1 for worker in workers if worker.ready),
+            "pending": pending,
+            "max_pending": self.max_pending,
+            "restarts": self.restarts,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_messages / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def close(self, timeout: float = 5.0):
+        self._closed.set()
+        for worker in self._workers.values():
+            worker.jobs.put(None)
+        for worker in self._workers.values():
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        if self._results is not None:
+            self._results.put(None)
+            self._collector.join(timeout)
@@ -0,0 +1,95 @@
+# response_cache.py
+# TTL + LRU cache for chatbot replies that only read rarely changing tables.
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+def normalize_entities(entities: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    """Case- and whitespace-insensitive, order-independent form of an entities dict"""
+    return tuple(sorted(
+        (name, re.sub(r"\s+", " ", str(value)).strip().lower())
+        for name, value in entities.items()
+    ))
+
+class ResponseCache:
+    """Replies keyed by (intent, normalized entities), each tagged with the tables it read.
+
+    Every table has a version counter. invalidate() bumps the counters of the given tables
+    (or a global generation), and an entry is only served while the versions it was stored
+    with are still current, so one write invalidates every cached reply built from that
+    table without scanning entries. The versions are taken on the miss, before the reply is
+    built, so a reply that raced an invalidation is stored as already stale.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def _snapshot(self, tables: Iterable[str]) -> tuple:
+        return (self._generation,) + tuple((table, self._versions.get(table, 0)) for table in tables)
+
+    def get(self, intent: str, entities: Dict[str, Any], tables: Iterable[str]) -> Tuple[Optional[str], tuple]:
+        """The cached reply (or None) and the current versions of the tables, to pass to put()"""
+        key = (intent, normalize_entities(entities))
+        with self._lock:
+            versions = self._snapshot(tables)
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, stored_versions, value = entry
+                if expires_at > time.monotonic() and stored_versions == versions:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value, versions
+                del self._entries[key]
+            self.misses += 1
+            return None, versions
+
+    def put(self, intent: str, entities: Dict[str, Any], versions: tuple, value: str):
+        """Store a reply under the versions get() returned before it was built"""
+        if not self.enabled:
+            return
+        key = (intent, normalize_entities(entities))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, versions, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tables: Optional[Iterable[str]] = None):
+        """Bump the version of the given tables, or of everything when none are given"""
+        with self._lock:
+            if tables is None:
+                self._generation += 1
+                self._entries.clear()
+                return
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "generation": self._generation,
+                "table_versions": dict(self._versions),
+            }
@@ -7,8 +7,14 @@ from sqlalchemy.exc import SQLAlchemyError
 # Create a blueprint for routes
 chatbot_bp = Blueprint('chatbot_bp', __name__)
 
-# Load spaCy model
-nlp = spacy.load("en_core_web_trf")
+# The transformer model takes seconds to load, so load it on the first request instead of on import
+_nlp = None
+
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        _nlp = spacy.load("en_core_web_trf")
+    return _nlp
 
 @chatbot_bp.route('/chatbot', methods=['POST'])
 def chatbot():
@@ -21,7 +27,7 @@ def chatbot():
 
         if user_message:
             # Process the message using spaCy to extract entities
-            doc = nlp(user_message)
+            doc = get_nlp()(user_message)
 
             entities = []
             for ent in doc.ents:
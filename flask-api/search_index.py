@@ -0,0 +1,156 @@
+# search_index.py
+# In-process trigram index for fuzzy product and supplier name lookups.
+import re
+import threading
+from collections import Counter
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").lower()).strip()
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between two strings"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+def similarity(query: str, text: str, query_grams: Optional[Set[str]] = None) -> float:
+    """Trigram Dice coefficient, with substring matches (what LIKE '%term%' finds) ranked above the rest"""
+    if query and query in text:
+        return 1.0 + len(query) / max(len(text), 1)
+    query_grams = query_grams if query_grams is not None else trigrams(query)
+    text_grams = trigrams(text)
+    return 2 * len(query_grams & text_grams) / (len(query_grams) + len(text_grams))
+
+class NameIndex:
+    """Trigram postings over one or more searchable texts per key (e.g. product name and category).
+
+    search() gathers candidates from the postings of the query's trigrams, scores each key by
+    its best text and ranks by score, then by edit distance, so "Lapto XPS" still finds
+    "Laptop XPS 15". Keys are kept up to date with upsert/remove or diffed in bulk with sync().
+    """
+
+    def __init__(self, min_score: float = 0.3, candidate_factor: int = 20):
+        self.min_score = min_score
+        self.candidate_factor = candidate_factor
+        self._texts: Dict[Hashable, Tuple[str, ...]] = {}
+        self._postings: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.ready = False
+
+    def __len__(self):
+        return len(self._texts)
+
+    def _add(self, key: Hashable, texts: Tuple[str, ...]):
+        self._texts[key] = texts
+        for text in texts:
+            for gram in trigrams(text):
+                self._postings.setdefault(gram, set()).add(key)
+
+    def _discard(self, key: Hashable):
+        texts = self._texts.pop(key, None)
+        if texts is None:
+            return
+        for text in texts:
+            for gram in trigrams(text):
+                keys = self._postings.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._postings[gram]
+
+    def upsert(self, key: Hashable, texts: Sequence[str]):
+        normalized = tuple(normalize(text) for text in texts if text)
+        with self._lock:
+            if self._texts.get(key) == normalized:
+                return
+            self._discard(key)
+            self._add(key, normalized)
+
+    def remove(self, key: Hashable):
+        with self._lock:
+            self._discard(key)
+
+    def sync(self, rows: Iterable[Tuple[Hashable, Sequence[str]]]) -> int:
+        """Bring the index in line with the given (key, texts) rows; returns how many keys changed"""
+        changed = 0
+        seen = set()
+        for key, texts in rows:
+            seen.add(key)
+            normalized = tuple(normalize(text) for text in texts if text)
+            with self._lock:
+                if self._texts.get(key) != normalized:
+                    self._discard(key)
+                    self._add(key, normalized)
+                    changed += 1
+        with self._lock:
+            for key in set(self._texts) - seen:
+                self._discard(key)
+                changed += 1
+        self.ready = True
+        return changed
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[Hashable, float]]:
+        """Best matching keys with their scores, best first"""
+        query = normalize(query)
+        if not query:
+            return []
+        query_grams = trigrams(query)
+        with self._lock:
+            overlap = Counter()
+            for gram in query_grams:
+                overlap.update(self._postings.get(gram, ()))
+            # Dice >= min_score needs at least min_score * |query grams| / 2 shared grams, and a substring
+            # match shares all but the (at most three) padded edge grams; only score the best-overlapping keys
+            needed = min(self.min_score * len(query_grams) / 2, len(query_grams) - 3)
+            scored = []
+            for key, shared in overlap.most_common(limit * self.candidate_factor):
+                if shared < needed:
+                    break
+                texts = self._texts[key]
+                best = max(texts, key=lambda text: similarity(query, text, query_grams))
+                score = similarity(query, best, query_grams)
+                if score >= self.min_score:
+                    scored.append((score, key, best))
+
+        scored.sort(key=lambda item: -item[0])
+        shortlist = scored[:limit * 3]
+        shortlist.sort(key=lambda item: (-round(item[0], 2), edit_distance(query, item[2])))
+        return [(key, score) for score, key, _ in shortlist[:limit]]
+
+def is_close_match(query: str, text: str, min_score: float = 0.8) -> bool:
+    """Whether text names the same thing as the query: it contains the query, or differs only by a
+    typo or two and has the same numbers (so "Galaxy S24" is not taken for "Galaxy S23")"""
+    query, text = normalize(query), normalize(text)
+    if not query or not text:
+        return False
+    if query in text:
+        return True
+    return similarity(query, text) >= min_score and re.findall(r"\d+", query) == re.findall(r"\d+", text)
+
+def rank_by_similarity(rows: List, query: str, texts: Callable) -> List:
+    """Order rows by how closely their best text matches the query"""
+    query = normalize(query)
+    return sorted(rows, key=lambda row: -max((similarity(query, normalize(text)) for text in texts(row) if text), default=0))
+
+def index_subscriber(index: NameIndex, key: str, texts: Callable) -> Callable:
+    """Change feed subscriber keeping an index in step with a table: full reloads are diffed
+    with sync(), deltas are upserted row by row"""
+    def apply(changes):
+        rows = ((getattr(row, key), texts(row)) for row in changes.rows)
+        if changes.full:
+            index.sync(rows)
+        else:
+            for row_key, row_texts in rows:
+                index.upsert(row_key, row_texts)
+    return apply
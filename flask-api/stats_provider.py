@@ -0,0 +1,63 @@
+# stats_provider.py
+# Table counts for overview answers, fetched in one round-trip and optionally kept as a refreshed snapshot.
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+class StatsProvider:
+    """Runs every counter as a scalar subquery of a single SELECT.
+
+    counters maps a name to a scalar subquery, e.g.
+    select(func.count(Product.ProductId)).scalar_subquery(). With a refresh_interval the
+    counts are also kept in a snapshot that a background thread refreshes, and counts()
+    serves that snapshot while it is no older than two intervals.
+    """
+
+    def __init__(self, counters: Dict[str, Any], session_factory: Optional[Callable] = None,
+                 refresh_interval: float = 0):
+        self.counters = counters
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[Dict[str, int]] = None
+        self._snapshot_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def fetch(self, db) -> Dict[str, int]:
+        """All counters in one round-trip"""
+        row = db.query(*[counter.label(name) for name, counter in self.counters.items()]).one()
+        return {name: int(value or 0) for name, value in row._mapping.items()}
+
+    def counts(self, db) -> Dict[str, int]:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._snapshot_at < 2 * self.refresh_interval:
+            return snapshot
+        return self.fetch(db)
+
+    def refresh(self):
+        db = self.session_factory()
+        try:
+            snapshot = self.fetch(db)
+        finally:
+            db.close()
+        self._snapshot, self._snapshot_at = snapshot, time.monotonic()
+
+    def start(self):
+        if self.refresh_interval <= 0 or self.session_factory is None:
+            return
+        self._thread = threading.Thread(target=self._run, name="stats-snapshot", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as ex:
+                print(f"Warning: stats snapshot refresh failed: {ex}")
+            if self._stop.wait(self.refresh_interval):
+                return
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.refresh_interval)
@@ -0,0 +1,116 @@
+# suggestion_ranker.py
+# In-memory suggestion usage counters with a cached top-K list and batched flushes to the database.
+import heapq
+import threading
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import bindparam, select, update
+
+class SuggestionRanker:
+    """Usage counts for every suggestion, kept in a dict keyed by content.
+
+    record() bumps a counter in O(1) and remembers the delta. top() serves the cached top-K
+    list and only recomputes it (heapq.nlargest) after a bump that can change it. A background
+    thread adds the accumulated deltas to the suggestions table in one executemany UPDATE,
+    so concurrent API processes never overwrite each other's counts.
+    """
+
+    def __init__(self, session_factory: Callable, model, top_k: int = 6, flush_interval: float = 30.0):
+        self.session_factory = session_factory
+        self.table = model.__table__
+        self.top_k = top_k
+        self.flush_interval = flush_interval
+        self._counts: Dict[str, int] = {}
+        self._order: Dict[str, int] = {}
+        self._deltas: Dict[str, int] = {}
+        self._top: List[str] = []
+        self._dirty = True
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.ready = False
+
+    def load(self, db):
+        rows = db.execute(
+            select(self.table.c.content, self.table.c.usage_count).order_by(self.table.c.id)
+        ).all()
+        with self._lock:
+            self._counts = {content: usage_count or 0 for content, usage_count in rows}
+            self._order = {content: position for position, (content, _) in enumerate(rows)}
+            self._dirty = True
+        self.ready = True
+
+    def add(self, content: str):
+        with self._lock:
+            if content not in self._counts:
+                self._counts[content] = 0
+                self._order[content] = len(self._order)
+                if len(self._top) < self.top_k:
+                    self._dirty = True
+
+    def _rank(self, content: str):
+        return self._counts[content], -self._order[content]
+
+    def record(self, content: str) -> bool:
+        """Count one use of a suggestion; False if the content is not a known suggestion"""
+        with self._lock:
+            count = self._counts.get(content)
+            if count is None:
+                return False
+            self._counts[content] = count + 1
+            self._deltas[content] = self._deltas.get(content, 0) + 1
+            if self._dirty:
+                return True
+            if content in self._top:
+                # Counts only grow, so a top entry stays in the top; just reorder the K entries
+                self._top.sort(key=self._rank, reverse=True)
+            elif len(self._top) < self.top_k or self._rank(content) > self._rank(self._top[-1]):
+                self._dirty = True
+            return True
+
+    def top(self, limit: Optional[int] = None) -> List[str]:
+        with self._lock:
+            if self._dirty:
+                self._top = heapq.nlargest(self.top_k, self._counts, key=self._rank)
+                self._dirty = False
+            return self._top[:limit or self.top_k]
+
+    def flush(self):
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+        if not deltas:
+            return
+        statement = (
+            update(self.table)
+            .where(self.table.c.content == bindparam("b_content"))
+            .values(usage_count=self.table.c.usage_count + bindparam("b_delta"))
+        )
+        db = self.session_factory()
+        try:
+            db.connection().execute(statement, [
+                {"b_content": content, "b_delta": delta} for content, delta in deltas.items()
+            ])
+            db.commit()
+        except Exception as ex:
+            db.rollback()
+            # Keep the deltas for the next flush
+            with self._lock:
+                for content, delta in deltas.items():
+                    self._deltas[content] = self._deltas.get(content, 0) + delta
+            print(f"Warning: suggestion usage flush failed: {ex}")
+        finally:
+            db.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="suggestion-flush", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
@@ -0,0 +1,34 @@
+# conftest.py
+# Lets the tests import the flat flask-api modules (intents, entity_rules, ...) directly.
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app reads its settings on import: point it at a throwaway SQLite file (shared by the request
+# threads, unlike :memory:) and keep spaCy out of the NLP tier
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "chatbot-tests.db"))
+os.environ.setdefault("NLP_PROFILE", "regex")
+
+@pytest.fixture(scope="session")
+def app_module():
+    pytest.importorskip("sqlalchemy")
+    pytest.importorskip("fastapi")
+    import app
+    app.init_db()
+    return app
+
+@pytest.fixture
+def db(app_module):
+    """A session on empty message tables"""
+    session = app_module.SessionLocal()
+    session.query(app_module.MessageDB).delete()
+    session.query(app_module.ArchivedMessageDB).delete()
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
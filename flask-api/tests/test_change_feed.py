@@ -0,0 +1,87 @@
+# test_change_feed.py
+# The change feed publishes a full load, then only the rows written since the last poll.
+import datetime
+
+import pytest
+
+sqlalchemy = pytest.importorskip("sqlalchemy")
+from sqlalchemy import Column, DateTime, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from change_feed import ChangeFeed
+
+Base = declarative_base()
+
+class Item(Base):
+    __tablename__ = "items"
+    ItemId = Column(Integer, primary_key=True)
+    Name = Column(String(50))
+    UpdatedAt = Column(DateTime)
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+@pytest.fixture
+def published():
+    return []
+
+@pytest.fixture
+def feed(session_factory, published):
+    feed = ChangeFeed(session_factory, interval=0)
+    feed.subscribe(feed.watch(Item, ["ItemId", "Name"]), published.append)
+    return feed
+
+@pytest.fixture
+def write(session_factory):
+    session = session_factory()
+
+    def write(**values):
+        session.merge(Item(**values))
+        session.commit()
+
+    yield write
+    session.close()
+
+def names(changes):
+    return sorted(row.Name for row in changes.rows)
+
+def test_full_load_then_only_changed_rows(feed, published, write):
+    t0 = datetime.datetime(2024, 1, 1)
+    write(ItemId=1, Name="kettle", UpdatedAt=t0)
+    write(ItemId=2, Name="toaster", UpdatedAt=t0)
+    feed.refresh()
+    assert published[-1].full and names(published[-1]) == ["kettle", "toaster"]
+
+    feed.refresh()
+    assert len(published) == 1
+
+    write(ItemId=2, Name="toaster v2", UpdatedAt=t0 + datetime.timedelta(minutes=1))
+    feed.refresh()
+    assert not published[-1].full and names(published[-1]) == ["toaster v2"]
+
+def test_insert_with_null_updated_at_is_published_once(feed, published, write):
+    write(ItemId=1, Name="kettle", UpdatedAt=datetime.datetime(2024, 1, 1))
+    feed.refresh()
+
+    # The backend leaves UpdatedAt NULL on insert
+    write(ItemId=2, Name="Quantum Toaster", UpdatedAt=None)
+    feed.refresh()
+    assert names(published[-1]) == ["Quantum Toaster"]
+    feed.refresh()
+    assert len(published) == 2
+
+def test_rows_sharing_the_watermark_are_not_lost(feed, published, write):
+    t0 = datetime.datetime(2024, 1, 1)
+    write(ItemId=1, Name="kettle", UpdatedAt=t0)
+    feed.refresh()
+
+    # Committed after the poll, with the same timestamp as the row already published
+    write(ItemId=2, Name="toaster", UpdatedAt=t0)
+    feed.refresh()
+    assert names(published[-1]) == ["toaster"]
+    feed.refresh()
+    assert len(published) == 2
@@ -0,0 +1,39 @@
+# test_chat_storage.py
+# save_chat_turns writes a batch of turns in one transaction and keeps them in conversation order.
+import datetime
+
+def test_bot_ids_need_no_reload(db, app_module):
+    from sqlalchemy import event
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(app_module.engine, "before_cursor_execute", record)
+    try:
+        ids = app_module.save_chat_turns(db, [
+            ("first question", "first answer", datetime.datetime.utcnow()),
+            ("second question", "second answer", datetime.datetime.utcnow()),
+        ], "storage")
+    finally:
+        event.remove(app_module.engine, "before_cursor_execute", record)
+
+    assert all(isinstance(message_id, int) for message_id in ids) and len(set(ids)) == 2
+    # The ids come back from the flush; nothing reads the messages again after the commit
+    assert not [s for s in statements if s.lstrip().upper().startswith("SELECT") and "messages" in s]
+    answers = {message_id: content for message_id, content in
+               db.query(app_module.MessageDB.id, app_module.MessageDB.content).filter(app_module.MessageDB.id.in_(ids))}
+    assert [answers[message_id] for message_id in ids] == ["first answer", "second answer"]
+
+def test_batch_turns_keep_conversation_order(db, app_module):
+    received_at = datetime.datetime.utcnow()
+    turns = [(f"question {i}", f"answer {i}", received_at) for i in range(3)]
+    app_module.save_chat_turns(db, turns, "batch-order")
+
+    # /history reads newest first by (timestamp, id); every reply follows its own question
+    page = app_module.load_history(db, 10, conversation_id="batch-order")
+    oldest_first = [message.content for message in reversed(page.messages)]
+    assert oldest_first == ["question 0", "answer 0", "question 1", "answer 1", "question 2", "answer 2"]
+    timestamps = [message.timestamp for message in reversed(page.messages)]
+    assert timestamps == sorted(set(timestamps))
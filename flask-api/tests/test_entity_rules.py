@@ -0,0 +1,107 @@
+# test_entity_rules.py
+# The ENTITY_RULES table must extract exactly the slots the original hand-written regex stage did.
+import random
+import re
+
+from entity_rules import EntityExtractor, EntityRule, entity_extractor
+
+def legacy_extract_slots(message: str):
+    # The regex stage of extract_entities before the rule table, patterns rebuilt on every call
+    entities = {}
+
+    product_search_patterns = [r"find\s+([\w\s]+)", r"search\s+for\s+([\w\s]+)", r"looking\s+for\s+([\w\s]+)"]
+    for pattern in product_search_patterns:
+        match = re.search(pattern, message, re.IGNORECASE)
+        if match:
+            entities["product_name"] = match.group(1).strip()
+            break
+
+    supplier_patterns = [
+        r"(?:supplier|vendor)\s+([A-Za-z\s]+?)(?:\s+(?:email|phone|contact|address)|$)",
+        r"(?:email|phone|contact|address)\s+(?:of|for)\s+(?:supplier|vendor)\s+([A-Za-z\s]+)(?:\?|$)",
+        r"(?:email|phone|contact|address)\s+(?:of|for)\s+([A-Za-z\s]+)(?:\?|$)"
+    ]
+    for pattern in supplier_patterns:
+        match = re.search(pattern, message, re.IGNORECASE)
+        if match:
+            entities["supplier_name"] = match.group(1).strip()
+            break
+
+    price_patterns = [
+        r"price\s+of\s+([\w\s\d]+?)(?:\?|$)",
+        r"how\s+much\s+(?:is|does|costs?)\s+([\w\s\d]+?)(?:\?|$)",
+        r"what(?:'s|\s+is)\s+the\s+price\s+of\s+([\w\s\d]+?)(?:\?|$)"
+    ]
+    for pattern in price_patterns:
+        match = re.search(pattern, message, re.IGNORECASE)
+        if match:
+            entities["product_name"] = match.group(1).strip()
+            break
+
+    field_patterns = {
+        "email": [r"email\s+(?:id|address)", r"e-?mail"],
+        "phone": [r"phone\s+(?:number|no\.?)", r"contact\s+number"],
+        "address": [r"address", r"location"],
+        "price": [r"price", r"cost", r"how much"],
+        "stock": [r"stock", r"inventory", r"available"]
+    }
+    for field, patterns in field_patterns.items():
+        for pattern in patterns:
+            if re.search(pattern, message, re.IGNORECASE):
+                entities["requested_field"] = field
+                break
+        if "requested_field" in entities:
+            break
+
+    quantity_pattern = r"(\d+)\s+(?:products?|items?|users?)"
+    match = re.search(quantity_pattern, message, re.IGNORECASE)
+    if match:
+        entities["quantity"] = int(match.group(1))
+
+    return entities
+
+TEMPLATES = [
+    "find {product}", "search for {product}", "I am looking for {product}", "price of {product}?",
+    "How much does the {product} cost?", "How much is {product}", "What's the price of {product}?",
+    "What is the price of {product}", "Is the {product} in stock?", "Which {product} are available in inventory?",
+    "Give email id of supplier {supplier}", "Get phone number of supplier {supplier}",
+    "Email address of supplier {supplier}", "phone for vendor {supplier}", "contact number of {supplier}",
+    "Address of supplier {supplier}", "supplier {supplier} email", "vendor {supplier}",
+    "Show me {count} products", "List {count} users", "{count} items", "e-mail for {supplier}?",
+    "location of {supplier}", "phone no. for supplier {supplier}",
+]
+PRODUCTS = ["Laptop XPS 15", "wireless headphones", "Gaming Mouse 7", "usb c cable", "Office Chair", "iPhone 15"]
+SUPPLIERS = ["Avantika Patil", "Tech Solutions", "Global Traders", "Acme Corp", "Metro Wholesale"]
+
+def corpus():
+    rng = random.Random(7)
+    messages = []
+    for template in TEMPLATES:
+        for product in PRODUCTS:
+            for supplier in SUPPLIERS:
+                messages.append(template.format(product=product, supplier=supplier, count=rng.randint(1, 50)))
+    # Two templates in one message, so several rules compete
+    for _ in range(2000):
+        first, second = rng.choice(TEMPLATES), rng.choice(TEMPLATES)
+        values = {"product": rng.choice(PRODUCTS), "supplier": rng.choice(SUPPLIERS), "count": rng.randint(1, 50)}
+        messages.append(f"{first.format(**values)} {rng.choice(['and', '', 'then', '?'])} {second.format(**values)}")
+    return messages
+
+def test_extract_matches_legacy_regex_stage():
+    mismatches = [(m, legacy_extract_slots(m), entity_extractor.extract(m)) for m in corpus()
+                  if legacy_extract_slots(m) != entity_extractor.extract(m)]
+    assert not mismatches
+
+def test_requested_field_keeps_first_listed_field():
+    assert entity_extractor.extract("email and phone of supplier Tech Solutions")["requested_field"] == "email"
+    assert entity_extractor.extract("stock and price of Laptop XPS 15")["requested_field"] == "price"
+
+def test_later_rule_overwrites_unless_disabled():
+    extractor = EntityExtractor([
+        EntityRule("slot", [r"a(\w)"]),
+        EntityRule("slot", [r"b(\w)"]),
+        EntityRule("slot", [r"c(\w)"], overwrite=False),
+    ])
+    assert extractor.extract("ax by cz") == {"slot": "y"}
+    assert extractor.extract("ax cz") == {"slot": "x"}
+    assert extractor.extract("cz") == {"slot": "z"}
@@ -0,0 +1,51 @@
+# test_fragment_store.py
+# Rendered rows are reused while the row is unchanged, and never shared between listings.
+import datetime
+
+from fragment_store import FragmentStore
+
+T0 = datetime.datetime(2024, 1, 1)
+
+def test_line_is_reused_until_the_row_changes():
+    store = FragmentStore(max_entries=10)
+    calls = []
+    render = store.renderer("list_products", lambda row: calls.append(row) or f"- {row[0]}")
+
+    assert render(("Kettle", 1, T0)) == "- Kettle"
+    assert render(("Kettle", 1, T0)) == "- Kettle"
+    assert len(calls) == 1
+    assert render(("Kettle Pro", 1, T0 + datetime.timedelta(seconds=1))) == "- Kettle Pro"
+    assert len(calls) == 2
+
+def test_unversioned_and_null_versions_compare_the_row():
+    store = FragmentStore(max_entries=10)
+    render = store.renderer("list_brands", lambda row: row[0], versioned=False)
+    assert render(("Acme", 7)) == "Acme"
+    assert render(("Acme Corp", 7)) == "Acme Corp"
+
+    render = store.renderer("list_products", lambda row: row[0])
+    assert render(("Kettle", 1, None)) == "Kettle"
+    assert render(("Kettle Pro", 1, None)) == "Kettle Pro"
+
+def test_renderers_never_share_lines():
+    store = FragmentStore(max_entries=10)
+    # Two listings over the same rows, even under one name, format their own lines
+    all_products = store.renderer("products", lambda row: f"- {row[0]}: {row[1]}")
+    out_of_stock = store.renderer("products", lambda row: f"* {row[0]} (sold out)")
+
+    assert all_products(("Kettle", "$20", 1, T0)) == "- Kettle: $20"
+    assert out_of_stock(("Kettle", 1, T0)) == "* Kettle (sold out)"
+    assert all_products(("Kettle", "$20", 1, T0)) == "- Kettle: $20"
+
+def test_stats_count_lines_per_listing():
+    store = FragmentStore(max_entries=10)
+    store.renderer("list_products", lambda row: row[0])(("Kettle", 1, T0))
+    store.renderer("out_of_stock", lambda row: row[0])(("Kettle", 1, T0))
+    assert store.stats()["entries"] == {"list_products": 1, "out_of_stock": 1}
+
+def test_full_listing_is_cleared_past_max_entries():
+    store = FragmentStore(max_entries=2)
+    render = store.renderer("list_products", lambda row: row[0])
+    for key in range(3):
+        render((f"item {key}", key, T0))
+    assert store.stats()["entries"] == {"list_products": 1}
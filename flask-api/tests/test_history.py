@@ -0,0 +1,38 @@
+# test_history.py
+# /history pages through one conversation newest first, with a bounded page size.
+import datetime
+
+import pytest
+
+@pytest.fixture
+def client(app_module):
+    from fastapi.testclient import TestClient
+    return TestClient(app_module.app)
+
+@pytest.mark.parametrize("limit", [0, -1, 1001])
+def test_out_of_range_limit_is_rejected(db, client, limit):
+    response = client.get("/history", params={"conversation_id": "paged", "limit": limit})
+    assert response.status_code == 422
+
+def test_pages_follow_the_cursor(db, app_module, client):
+    start = datetime.datetime(2024, 1, 1)
+    for i in range(5):
+        db.add(app_module.MessageDB(content=f"message {i}", is_user=1,
+                                    timestamp=start + datetime.timedelta(seconds=i), conversation_id="paged"))
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        params = {"conversation_id": "paged", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/history", params=params).json()
+        seen += [message["content"] for message in page["messages"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"message {i}" for i in range(4, -1, -1)]
+
+def test_empty_conversation_has_no_cursor(db, client):
+    page = client.get("/history", params={"conversation_id": "empty", "limit": 1}).json()
+    assert page == {"messages": [], "next_cursor": None}
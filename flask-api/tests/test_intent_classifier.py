@@ -0,0 +1,71 @@
+# test_intent_classifier.py
+# The compiled IntentClassifier must classify exactly like the original nested loop over INTENT_PATTERNS.
+import random
+import re
+
+import pytest
+
+from intent_classifier import IntentClassifier, intent_classifier
+from intents import INTENT_PATTERNS, FALLBACK_INTENT_PATTERNS
+
+def legacy_classify_intent(message: str) -> str:
+    # The original nested loop over raw pattern strings
+    message_lower = message.lower()
+    for intent, patterns in INTENT_PATTERNS.items():
+        for pattern in patterns:
+            if re.search(pattern, message_lower, re.IGNORECASE):
+                return intent
+    for intent, pattern in FALLBACK_INTENT_PATTERNS:
+        if re.search(pattern, message_lower):
+            return intent
+    return "unknown"
+
+def literal_phrase(pattern: str) -> str:
+    # One literal phrase a pattern matches: whitespace classes become spaces, groups their first option
+    phrase = re.sub(r"\\s[+*]?", " ", pattern)
+    return re.sub(r"\(\?:([^|)]*)[^)]*\)\??|\\b|[?]", r"\1", phrase)
+
+NOISE = ["please", "can you", "today", "now", "of supplier Avantika Patil", "for Laptop XPS 15",
+         "20 items", "?", "!", "LIST", "Show", "the", "and", "Tech Solutions", "how much"]
+
+def corpus():
+    phrases = [literal_phrase(pattern) for patterns in INTENT_PATTERNS.values() for pattern in patterns]
+    phrases += [literal_phrase(pattern) for _, pattern in FALLBACK_INTENT_PATTERNS]
+    messages = []
+    for phrase in phrases:
+        messages.extend([phrase, phrase.upper(), f"please {phrase} today", f"{phrase} of supplier Avantika Patil"])
+    # Random mixes of phrases and noise, so several rules compete for the same message
+    rng = random.Random(42)
+    words = phrases + NOISE
+    for _ in range(3000):
+        messages.append(" ".join(rng.choice(words) for _ in range(rng.randint(1, 4))))
+    return messages
+
+CORPUS = corpus()
+
+def test_classify_matches_legacy_loop():
+    mismatches = [(m, legacy_classify_intent(m), intent_classifier.classify(m)) for m in CORPUS
+                  if legacy_classify_intent(m) != intent_classifier.classify(m)]
+    assert not mismatches
+
+def test_matches_spans_and_order():
+    for message in CORPUS:
+        matches = intent_classifier.matches(message)
+        expected = [
+            (rule.intent, rule.pattern, re.search(rule.pattern, message.lower(), re.IGNORECASE).span())
+            for rule in intent_classifier.rules
+            if re.search(rule.pattern, message.lower(), re.IGNORECASE)
+        ]
+        assert [(match.intent, match.pattern, match.span) for match in matches] == expected
+        assert (matches[0].intent if matches else "unknown") == intent_classifier.classify(message)
+
+def test_rules_keep_declaration_priority():
+    ordered = [(intent, pattern) for intent, patterns in INTENT_PATTERNS.items() for pattern in patterns]
+    ordered += list(FALLBACK_INTENT_PATTERNS)
+    assert [(rule.intent, rule.pattern) for rule in intent_classifier.rules] == ordered
+    assert [rule.priority for rule in intent_classifier.rules] == list(range(len(ordered)))
+
+@pytest.mark.parametrize("message", ["", "hello there", "12345"])
+def test_unmatched_message_gets_default_intent(message):
+    assert IntentClassifier({}, default_intent="fallback").classify(message) == "fallback"
+    assert intent_classifier.classify(message) == legacy_classify_intent(message)
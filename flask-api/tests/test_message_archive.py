@@ -0,0 +1,77 @@
+# test_message_archive.py
+# archive_batch moves whole idle conversations to messages_archive, a bounded batch at a time.
+import datetime
+
+def add_messages(db, app_module, conversation_id, count, when):
+    for i in range(count):
+        db.add(app_module.MessageDB(content=f"message {i}", is_user=i % 2, timestamp=when,
+                                    conversation_id=conversation_id))
+    db.commit()
+
+def counts(db, app_module):
+    return db.query(app_module.MessageDB).count(), db.query(app_module.ArchivedMessageDB).count()
+
+def test_archives_idle_conversations_only(db, app_module):
+    now = datetime.datetime.utcnow()
+    cutoff = now - datetime.timedelta(days=30)
+    add_messages(db, app_module, "idle", 3, cutoff - datetime.timedelta(days=1))
+    add_messages(db, app_module, "active", 2, now)
+
+    assert app_module.archive_batch(db, cutoff, 10) == 3
+    assert counts(db, app_module) == (2, 3)
+    archived = db.query(app_module.ArchivedMessageDB.conversation_id).distinct().all()
+    assert archived == [("idle",)]
+
+def test_repeated_runs_do_not_collide_on_reused_ids(db, app_module):
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=30)
+    old = cutoff - datetime.timedelta(days=1)
+    # SQLite hands the ids of the archived rows out again, so the second run copies the same ids
+    for run in range(3):
+        add_messages(db, app_module, f"idle-{run}", 2, old)
+        assert app_module.archive_batch(db, cutoff, 10) == 2
+    assert counts(db, app_module) == (0, 6)
+
+def test_legacy_messages_respect_batch_size(db, app_module):
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=30)
+    old = cutoff - datetime.timedelta(days=1)
+    add_messages(db, app_module, None, 5, old)
+    add_messages(db, app_module, "idle-a", 1, old)
+    add_messages(db, app_module, "idle-b", 1, old)
+    add_messages(db, app_module, "idle-c", 1, old)
+
+    # Two conversations and two legacy messages per batch
+    assert app_module.archive_batch(db, cutoff, 2) == 4
+    assert counts(db, app_module) == (4, 4)
+    assert app_module.archive_batch(db, cutoff, 2) == 3
+    assert app_module.archive_batch(db, cutoff, 2) == 1
+    assert app_module.archive_batch(db, cutoff, 2) == 0
+    assert counts(db, app_module) == (0, 8)
+
+def test_message_written_between_copy_and_delete_is_kept(db, app_module):
+    now = datetime.datetime.utcnow()
+    cutoff = now - datetime.timedelta(days=30)
+    add_messages(db, app_module, "idle", 2, cutoff - datetime.timedelta(days=1))
+
+    execute = db.execute
+
+    def execute_then_reply(statement, *args, **kwargs):
+        result = execute(statement, *args, **kwargs)
+        if statement.is_insert:
+            # The conversation is picked up again while the batch is between its two statements
+            db.add(app_module.MessageDB(content="back again", is_user=1, timestamp=now, conversation_id="idle"))
+            db.flush()
+        return result
+
+    db.execute = execute_then_reply
+    assert app_module.archive_batch(db, cutoff, 10) == 2
+    remaining = db.query(app_module.MessageDB.content).all()
+    assert remaining == [("back again",)]
+    assert counts(db, app_module) == (1, 2)
+
+def test_history_requires_a_conversation(db, app_module):
+    from fastapi.testclient import TestClient
+    client = TestClient(app_module.app)
+    assert client.get("/history").status_code == 422
+    assert client.get("/history", params={"conversation_id": ""}).status_code == 422
+    assert client.get("/history/export").status_code == 422
+    assert client.get("/history", params={"conversation_id": "none-yet"}).status_code == 200
@@ -0,0 +1,50 @@
+# test_request_metrics.py
+# Every chat endpoint reports its turns, latency, errors and DB work on /metrics.
+import re
+
+import pytest
+
+@pytest.fixture
+def client(app_module):
+    from fastapi.testclient import TestClient
+    app_module.response_cache.invalidate()
+    return TestClient(app_module.app)
+
+def scrape(client, name, **labels):
+    """Sum of a /metrics series over the label values not given"""
+    total = 0.0
+    for line in client.get("/metrics").text.splitlines():
+        match = re.match(r"chatbot_%s(?:\{(.*)\})? (\S+)$" % name, line)
+        if match and all(f'{key}="{value}"' in (match.group(1) or "") for key, value in labels.items()):
+            total += float(match.group(2))
+    return total
+
+def test_stream_records_turn_latency_and_queries(db, client):
+    before = (scrape(client, "requests_total"), scrape(client, "request_seconds_count", endpoint="chatbot_stream"),
+              scrape(client, "request_db_queries_total"))
+    response = client.post("/chatbot/stream", json={"message": "List all brands"})
+    assert "event: done" in response.text
+
+    assert scrape(client, "requests_total") == before[0] + 1
+    assert scrape(client, "request_seconds_count", endpoint="chatbot_stream") == before[1] + 1
+    # At least the listing query and the insert of the turn
+    assert scrape(client, "request_db_queries_total") >= before[2] + 2
+
+def test_stream_failure_counts_as_an_error(db, client, app_module, monkeypatch):
+    def fail(message, db, analysis=None):
+        raise RuntimeError("catalog unavailable")
+        yield
+
+    monkeypatch.setattr(app_module, "stream_response", fail)
+    before = scrape(client, "request_errors_total", reason="error")
+    response = client.post("/chatbot/stream", json={"message": "List all brands"})
+    assert "event: error" in response.text and "catalog unavailable" in response.text
+    assert scrape(client, "request_errors_total", reason="error") == before + 1
+
+def test_batch_records_every_turn(db, client):
+    before = (scrape(client, "requests_total"), scrape(client, "request_seconds_count", endpoint="chatbot_batch"))
+    response = client.post("/chatbot/batch", json={"messages": ["List all brands", "Show product categories", "help"]})
+    assert response.status_code == 200
+
+    assert scrape(client, "requests_total") == before[0] + 3
+    assert scrape(client, "request_seconds_count", endpoint="chatbot_batch") == before[1] + 1
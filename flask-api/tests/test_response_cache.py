@@ -0,0 +1,32 @@
+# test_response_cache.py
+# Cached replies are only served while the tables they were built from are unchanged.
+from response_cache import ResponseCache
+
+def test_hit_until_table_changes():
+    cache = ResponseCache(max_entries=8, ttl_seconds=60)
+    value, versions = cache.get("product_price", {"product_name": "XPS 15"}, ["products"])
+    assert value is None
+    cache.put("product_price", {"product_name": "XPS 15"}, versions, "$1,299")
+
+    # Entities are matched case- and whitespace-insensitively
+    assert cache.get("product_price", {"product_name": " xps  15"}, ["products"])[0] == "$1,299"
+    cache.invalidate(["suppliers"])
+    assert cache.get("product_price", {"product_name": "XPS 15"}, ["products"])[0] == "$1,299"
+    cache.invalidate(["products"])
+    assert cache.get("product_price", {"product_name": "XPS 15"}, ["products"])[0] is None
+
+def test_reply_built_across_a_table_invalidation_is_stale():
+    cache = ResponseCache(max_entries=8, ttl_seconds=60)
+    _, versions = cache.get("list_products", {}, ["products"])
+    # The table changes while the reply is being built from the old rows
+    cache.invalidate(["products"])
+    cache.put("list_products", {}, versions, "old listing")
+    assert cache.get("list_products", {}, ["products"])[0] is None
+
+def test_reply_built_across_a_full_invalidation_is_stale():
+    cache = ResponseCache(max_entries=8, ttl_seconds=60)
+    _, versions = cache.get("list_products", {}, ["products"])
+    cache.invalidate()
+    cache.put("list_products", {}, versions, "old listing")
+    assert cache.get("list_products", {}, ["products"])[0] is None
+    assert cache.stats()["generation"] == 1
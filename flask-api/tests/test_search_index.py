@@ -0,0 +1,24 @@
+# test_search_index.py
+# Attribute questions are only answered from a product or supplier that matches the asked-for name.
+from search_index import is_close_match
+
+def test_contained_and_misspelled_names_match():
+    assert is_close_match("xps 15", "Laptop XPS 15")
+    assert is_close_match("Laptop XPS 15", "laptop  xps 15")
+    assert is_close_match("Avantika Patl", "Avantika Patil")
+    assert is_close_match("Tech Solutons", "Tech Solutions")
+
+def test_other_names_do_not_match():
+    assert not is_close_match("Galaxy S24", "Galaxy S23")
+    assert not is_close_match("Quantum Toaster", "Laptop XPS 15")
+    assert not is_close_match("Tech Solutions", "Green Foods")
+    assert not is_close_match("", "Laptop XPS 15")
+
+def test_closest_match_rejects_unrelated_rows(app_module):
+    class Row:
+        def __init__(self, name):
+            self.Name, self.Category = name, "Laptops"
+
+    rows = [Row("Laptop XPS 15"), Row("Laptop XPS 13")]
+    assert app_module.closest_match(rows, "XPS 13", app_module.product_texts).Name == "Laptop XPS 13"
+    assert app_module.closest_match(rows, "Quantum Toaster", app_module.product_texts) is None
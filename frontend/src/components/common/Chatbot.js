@@ -17,6 +17,7 @@ const Chatbot = () => {
   const inputRef = useRef(null);
   
   const apiBaseUrl = 'http://localhost:5000';
+  const conversationIdRef = useRef(localStorage.getItem('chatbotConversationId'));
 
   useEffect(() => {
     const initialize = async () => {
@@ -63,7 +64,11 @@ const Chatbot = () => {
   const fetchMessageHistory = async () => {
     setIsHistoryLoading(true);
     try {
-      const response = await axios.get(`${apiBaseUrl}/history?limit=20`);
+      const conversationId = conversationIdRef.current;
+      if (!conversationId) return;
+      const response = await axios.get(`${apiBaseUrl}/history`, {
+        params: { limit: 20, conversation_id: conversationId }
+      });
       
       if (response.data.messages && response.data.messages.length > 0) {
         setMessages(prevMessages => {
@@ -117,24 +122,64 @@ const Chatbot = () => {
     setIsLoading(true);
     setShowSuggestions(false);
 
+    let botMessageId = null;
     try {
-      const response = await axios.post(`${apiBaseUrl}/chatbot`, { message: content });
-      const botMessageId = `bot-${Date.now()}`;
-      const botMessage = { 
-        id: botMessageId, 
-        text: response.data.message, 
-        isUser: false, 
-        timestamp: new Date() 
-      };
+      // Stream the reply over server-sent events so long listings render as rows arrive
+      const response = await fetch(`${apiBaseUrl}/chatbot/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          message: content,
+          conversation_id: conversationIdRef.current
+        })
+      });
+      if (!response.ok || !response.body) {
+        throw new Error(`Request failed with status ${response.status}`);
+      }
+
+      botMessageId = `bot-${Date.now()}`;
+      setMessages((prev) => [...prev, { id: botMessageId, text: '', isUser: false, timestamp: new Date() }]);
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let finished = false;
+      while (!finished) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const rawEvent of events) {
+          const eventName = rawEvent.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(rawEvent.match(/^data: (.*)$/m)?.[1] || '{}');
+          if (eventName === 'start' && data.conversation_id !== conversationIdRef.current) {
+            conversationIdRef.current = data.conversation_id;
+            localStorage.setItem('chatbotConversationId', data.conversation_id);
+          } else if (eventName === 'chunk') {
+            setMessages((prev) => prev.map((msg) => (
+              msg.id === botMessageId ? { ...msg, text: msg.text + data.text } : msg
+            )));
+          } else if (eventName === 'error') {
+            // The server answered but could not build the reply; show its message in place of the partial one
+            setMessages((prev) => prev.map((msg) => (
+              msg.id === botMessageId ? { ...msg, text: data.detail || 'Sorry, something went wrong.' } : msg
+            )));
+            finished = true;
+          } else if (eventName === 'done') {
+            finished = true;
+          }
+        }
+      }
       
-      setMessages((prev) => [...prev, botMessage]);
       await fetchSuggestions();
       setShowSuggestions(true);
       
     } catch (err) {
       console.error('Error:', err);
       setMessages((prev) => [
-        ...prev,
+        // Drop a reply that was cut off mid-stream
+        ...prev.filter((msg) => msg.id !== botMessageId),
         { 
           id: `error-${Date.now()}`, 
           text: 'Connection error: Cannot reach the server. Please make sure the backend is running on port 5000.', 